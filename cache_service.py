@@ -0,0 +1,233 @@
+import os
+import sys
+import json
+import atexit
+import time
+import queue
+import shutil
+import threading
+import subprocess
+from utils import log_message
+
+# Der Audio-Cache merkt sich pro Eintrag das echte Containerformat. Lokale Engines (XTTS,
+# pyttsx3) schreiben unkomprimiertes WAV - das wird nach dem ersten Abspielen im Hintergrund
+# nach OGG/Vorbis umgewandelt (pygame spielt Vorbis zuverlässig, Opus nur mit neuerem SDL_mixer).
+AUDIO_CACHE_INDEX = "index.json"
+AUDIO_CACHE_EXTENSIONS = {"mp3": ".mp3", "wav": ".wav", "ogg": ".ogg"}
+AUDIO_CACHE_FORMATS = {ext: fmt for fmt, ext in AUDIO_CACHE_EXTENSIONS.items()}
+
+def sniff_audio_format(path):
+    """Erkennt das Format am Dateikopf statt an der Endung."""
+    try:
+        with open(path, "rb") as f: head = f.read(12)
+    except OSError: return None
+    if head[:4] == b"RIFF" and head[8:12] == b"WAVE": return "wav"
+    if head[:4] == b"OggS": return "ogg"
+    if head[:3] == b"ID3" or (len(head) > 1 and head[0] == 0xFF and head[1] & 0xE0 == 0xE0): return "mp3"
+    return None
+
+def transcode_to_ogg(src, dst):
+    """WAV -> OGG/Vorbis über soundfile (falls installiert) oder ffmpeg. False, wenn keins da ist."""
+    try:
+        import soundfile as sf
+        data, rate = sf.read(src)
+        sf.write(dst, data, rate, format="OGG", subtype="VORBIS")
+        return True
+    except ImportError: pass
+    ffmpeg = shutil.which("ffmpeg")
+    if not ffmpeg: return False
+    flags = 0x08000000 if sys.platform == "win32" else 0  # CREATE_NO_WINDOW
+    subprocess.run([ffmpeg, "-y", "-loglevel", "error", "-i", src, "-c:a", "libvorbis", "-q:a", "4", "-f", "ogg", dst],
+                   check=True, timeout=120, creationflags=flags)
+    return True
+
+class AudioCache:
+    """Index über den Ordner AudioCache: Schlüssel -> Datei, echtes Format, Größe, letzte Nutzung."""
+    def __init__(self, cache_dir, max_bytes):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        if not os.path.exists(cache_dir): os.makedirs(cache_dir)
+        self.index_path = os.path.join(cache_dir, AUDIO_CACHE_INDEX)
+        self._lock = threading.RLock()
+        self._jobs = queue.Queue()
+        self._worker = None
+        self._pending = set()
+        self._stale = []
+        self._encoder_missing = False
+        self._dirty = False        # last_used geändert, noch nicht im Index gespeichert
+        self.entries = {}
+        self.stats = {"transcoded": 0, "bytes_before": 0, "bytes_after": 0}
+        self._load_index()
+        atexit.register(self.flush)
+
+    # --- Index ---
+    def _load_index(self):
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f: data = json.load(f)
+            self.entries = data.get("entries", {})
+            self.stats.update(data.get("stats", {}))
+        except: self.entries = {}
+        # Einträge ohne Datei verwerfen (z.B. von Hand gelöscht)
+        self.entries = {k: e for k, e in self.entries.items() if os.path.exists(os.path.join(self.cache_dir, e["file"]))}
+
+    def _save_index(self):
+        with self._lock:
+            self._dirty = False
+            data = {"entries": self.entries, "stats": self.stats}
+            tmp = self.index_path + ".tmp"
+            try:
+                with open(tmp, "w", encoding="utf-8") as f: json.dump(data, f)
+                os.replace(tmp, self.index_path)
+            except Exception as e: log_message(f"Cache-Index nicht gespeichert: {e}", level="WARNING")
+
+    def flush(self):
+        """Sichert noch nicht gespeicherte Nutzungszeiten (beim Beenden)."""
+        if self._dirty: self._save_index()
+
+    def target_path(self, key, fmt):
+        return os.path.join(self.cache_dir, f"quest_{key}{AUDIO_CACHE_EXTENSIONS[fmt]}")
+
+    def lookup(self, key):
+        """Pfad einer vorhandenen Audiodatei oder None. Übernimmt alte quest_<hash>.mp3 ohne Index."""
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                legacy = self.target_path(key, "mp3")
+                if not os.path.exists(legacy): return None
+                entry = self._make_entry(legacy)
+                if entry is None: return None
+                self.entries[key] = entry
+            path = os.path.join(self.cache_dir, entry["file"])
+            if not os.path.exists(path):
+                del self.entries[key]; return None
+            # Gespeichert wird gebündelt mit mark_played bzw. enforce_limit
+            entry["last_used"] = time.time()
+            self._dirty = True
+            return path
+
+    def _make_entry(self, path):
+        try: size = os.path.getsize(path)
+        except OSError: return None
+        if size == 0: return None
+        # Unbekannter Dateikopf: der Endung glauben, pygame spielt es notfalls trotzdem
+        fmt = sniff_audio_format(path) or AUDIO_CACHE_FORMATS.get(os.path.splitext(path)[1].lower())
+        if fmt is None: return None
+        return {"file": os.path.basename(path), "format": fmt, "bytes": size, "last_used": time.time()}
+
+    def register(self, key, path):
+        """Nimmt eine frisch erzeugte Datei mit ihrem echten Format auf. Leere/unbrauchbare Dateien werden gelöscht."""
+        entry = self._make_entry(path)
+        if entry is None:
+            log_message(f"Audiodatei unbrauchbar, verworfen: {os.path.basename(path)}", level="WARNING")
+            try: os.remove(path)
+            except OSError: pass
+            return False
+        with self._lock:
+            old = self.entries.get(key)
+            self.entries[key] = entry
+            if old is not None and old["file"] != entry["file"]: self._stale.append(os.path.join(self.cache_dir, old["file"]))
+        self._save_index()
+        self._remove_stale()
+        return True
+
+    # --- Transkodierung ---
+    def mark_played(self, key):
+        """Nach dem Abspielen: geänderte Nutzungszeiten sichern, WAV im Hintergrund komprimieren."""
+        if self._dirty: self._save_index()
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry is None or entry["format"] != "wav" or key in self._pending or self._encoder_missing: return
+            self._pending.add(key)
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._transcode_loop, name="AudioTranscoder", daemon=True)
+                self._worker.start()
+        self._jobs.put(key)
+
+    def _transcode_loop(self):
+        while True:
+            key = self._jobs.get()
+            try: self._transcode(key)
+            except Exception as e: log_message(f"Transkodierung fehlgeschlagen ({key}): {e}", level="WARNING")
+            finally:
+                with self._lock: self._pending.discard(key)
+            self._remove_stale()
+
+    def _transcode(self, key):
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry is None or entry["format"] != "wav" or self._encoder_missing: return
+            src = os.path.join(self.cache_dir, entry["file"])
+        dst = self.target_path(key, "ogg")
+        tmp = dst + ".tmp"
+        try: encoded = transcode_to_ogg(src, tmp)
+        except Exception:
+            self._discard(tmp); raise
+        if not encoded:
+            self._discard(tmp)
+            self._encoder_missing = True
+            log_message("Kein Encoder (soundfile oder ffmpeg) gefunden - Cache bleibt unkomprimiert.", level="WARNING")
+            return
+        os.replace(tmp, dst)
+        before, after = entry["bytes"], os.path.getsize(dst)
+        with self._lock:
+            # Index erst umstellen, wenn die neue Datei vollständig da ist
+            if self.entries.get(key) is not entry:
+                # Inzwischen neu registriert: die OGG gehört zu keinem Eintrag mehr
+                current = self.entries.get(key)
+                if current is None or current["file"] != os.path.basename(dst): self._stale.append(dst)
+                return
+            self.entries[key] = dict(entry, file=os.path.basename(dst), format="ogg", bytes=after)
+            self.stats["transcoded"] += 1
+            self.stats["bytes_before"] += before
+            self.stats["bytes_after"] += after
+            self._stale.append(src)
+        self._save_index()
+
+    @staticmethod
+    def _discard(path):
+        try: os.remove(path)
+        except OSError: pass
+
+    def _remove_stale(self):
+        # Unter Windows ist eine gerade abgespielte Datei gesperrt - später erneut versuchen
+        with self._lock: stale, self._stale = self._stale, []
+        for path in stale:
+            try: os.remove(path)
+            except FileNotFoundError: pass
+            except OSError:
+                with self._lock: self._stale.append(path)
+
+    # --- Größenlimit ---
+    def enforce_limit(self):
+        """Löscht die am längsten nicht genutzten Einträge, bis der Cache unter max_bytes liegt."""
+        self._remove_stale()
+        known = set()
+        with self._lock:
+            for entry in self.entries.values(): known.add(entry["file"])
+        # Dateien ohne Index-Eintrag (Altbestand) zählen mit ihrer mtime
+        items = []
+        for name in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, name)
+            if name == AUDIO_CACHE_INDEX or not os.path.isfile(path) or name in known: continue
+            stat = os.stat(path); items.append((stat.st_mtime, stat.st_size, path, None))
+        with self._lock:
+            for key, entry in self.entries.items():
+                items.append((entry["last_used"], entry["bytes"], os.path.join(self.cache_dir, entry["file"]), key))
+        total = sum(size for _, size, _, _ in items)
+        if total <= self.max_bytes:
+            if self._dirty: self._save_index()
+            return
+        items.sort(key=lambda x: x[0])
+        for _, size, path, key in items:
+            if total <= self.max_bytes: break
+            try: os.remove(path); total -= size
+            except: continue
+            if key is not None:
+                with self._lock: self.entries.pop(key, None)
+        self._save_index()
+
+    def report(self):
+        s = self.stats
+        saved = s["bytes_before"] - s["bytes_after"]
+        ratio = s["bytes_before"] / s["bytes_after"] if s["bytes_after"] else 0.0
+        return f"Audio-Cache: {s['transcoded']} Dateien komprimiert, {saved / 1024 / 1024:.1f} MB gespart (Faktor {ratio:.1f})"
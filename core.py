@@ -4,36 +4,231 @@ import time
 import difflib
 import threading
 import json
-from utils import load_config, load_mapping, save_mapping, log_message
+import collections
+from utils import ConfigStore, load_mapping, save_mapping, log_message, startup_profile, CancelToken, ScanCancelled
 from ocr_service import OCRExtractor
 from tts_service import TTSService
+from correction_service import TextCorrector
+from cache_service import AudioCache
+from model_manager import ModelManager
 
 MAX_CACHE_SIZE_BYTES = 1024 * 1024 * 1024 
+SCAN_REPORT_EVERY = 20
+SCAN_OUTCOMES_KEPT = 64  # Ergebnisse für wait(), auch wenn niemand (mehr) darauf wartet
+
+class ScanScheduler:
+    """Single-Flight für Scans: höchstens einer läuft, höchstens einer wartet.
+
+    Auslöser, bevor der laufende Scan seinen Screenshot hat, übernimmt dieser Scan gleich mit; ein
+    weiterer wartender Auslöser ersetzt den älteren (beides coalesced). Erst ein Auslöser nach dem
+    Screenshot bricht den laufenden Scan ab (superseded) - der liest dann einen veralteten Dialog.
+    Test-Scans und Vorlesen über die API laufen als eigene Jobs durch dieselbe Warteschlange.
+    """
+    def __init__(self, run_scan):
+        self._run_scan = run_scan  # run_scan(cancel) -> (text, quelle)
+        self._lock = threading.Lock()
+        self._pending = None       # Job des wartenden Auslösers
+        self._current = None       # CancelToken des laufenden Jobs
+        self._current_job = None
+        self._current_covers = 0   # höchste Auslöser-Nummer, die der laufende Job mit abdeckt
+        self._worker = None
+        self._result_callbacks = []
+        self._state_callbacks = []
+        self._done = threading.Condition(self._lock)
+        self._waiting = {}         # Auslöser-Nummer -> angeforderter Job, bis ein Lauf ihn abdeckt
+        self._outcomes = collections.OrderedDict()  # Auslöser-Nummer -> (zustand, ergebnis) für wait()
+        self.last_result = None
+        self.stats = {"triggers": 0, "executed": 0, "coalesced": 0, "superseded": 0, "failed": 0,
+                      "scan_seconds": 0.0, "cancelled_seconds": 0.0}
+
+    def subscribe(self, on_result=None, on_state=None):
+        """on_result(text, quelle) nach jedem fertigen Scan, on_state("running"/"idle").
+
+        Laufen im Scan-Thread (on_state sogar unter dem Scheduler-Lock) - also kurz halten.
+        """
+        if on_result: self._result_callbacks.append(on_result)
+        if on_state: self._state_callbacks.append(on_state)
+
+    def trigger(self, reason="manuell", job=None):
+        """Kehrt sofort zurück; der Scan läuft im Scheduler-Thread. Liefert die Nummer für wait().
+
+        job(cancel) -> (text, quelle) ersetzt den normalen Scan (z.B. Test-Scan ohne Audio).
+        """
+        job = job or self._run_scan
+        with self._lock:
+            self.stats["triggers"] += 1
+            ticket = self.stats["triggers"]
+            self._waiting[ticket] = job
+            current = self._current
+            if (current is not None and not current.captured and not self._pending
+                    and job is self._run_scan and self._current_job is self._run_scan):
+                # Der laufende Scan hat noch keinen Screenshot - er liest den neuen Stand ohnehin
+                self.stats["coalesced"] += 1
+                self._current_covers = ticket
+            else:
+                if self._pending: self.stats["coalesced"] += 1  # der ältere wartende Auslöser entfällt
+                self._pending = job
+                if current is not None and current.captured: current.cancel()
+                if self._worker is None:
+                    self._worker = threading.Thread(target=self._loop, name="ScanScheduler", daemon=True)
+                    self._worker.start()
+            report = self.stats["triggers"] % SCAN_REPORT_EVERY == 0
+        log_message(f"Scan ausgelöst ({reason})", level="DEBUG")
+        if report: log_message(self.report())
+        return ticket
+
+    def wait(self, ticket, timeout=None):
+        """Wartet auf das Ergebnis des Auslösers ticket. Liefert (zustand, (text, quelle) oder None).
+
+        zustand: "executed", "failed", "timeout" oder "superseded" - letzteres, wenn statt des
+        angeforderten Jobs ein anderer lief (z.B. ein Hotkey-Scan statt des Test-Scans).
+        """
+        with self._lock:
+            if not self._done.wait_for(lambda: ticket not in self._waiting, timeout): return "timeout", None
+            return self._outcomes.pop(ticket, ("superseded", None))
+
+    def is_busy(self):
+        return self._worker is not None
+
+    def _loop(self):
+        self._notify(self._state_callbacks, "running")
+        while True:
+            with self._lock:
+                if not self._pending:
+                    # Noch unter dem Lock melden, damit ein neuer Worker nicht vor "idle" "running" meldet
+                    self._worker = None
+                    self._notify(self._state_callbacks, "idle")
+                    return
+                job, self._pending = self._pending, None
+                self._current_job, self._current_covers = job, self.stats["triggers"]
+                token = self._current = CancelToken()
+            start = time.perf_counter()
+            result, outcome = None, "executed"
+            try: result = job(token)
+            except ScanCancelled: outcome = "superseded"
+            except Exception as e:
+                log_message(f"Scan Fehler: {e}", level="ERROR"); outcome = "failed"
+            with self._lock:
+                self._current = self._current_job = None
+                self.stats[outcome] += 1
+                if outcome == "executed": self.stats["scan_seconds"] += time.perf_counter() - start
+                elif outcome == "superseded": self.stats["cancelled_seconds"] += time.perf_counter() - start
+                if outcome != "superseded":
+                    self.last_result = result
+                    self._settle(job, self._current_covers, outcome, result)
+            if outcome == "superseded": log_message("Scan abgelöst", level="DEBUG", ms=int((time.perf_counter() - start) * 1000))
+            if result is not None: self._notify(self._result_callbacks, *result)
+
+    def _settle(self, job, covers, outcome, result):
+        # Abgebrochene Läufe lassen ihre Auslöser offen - die deckt der nächste fertige Lauf ab
+        for ticket in [t for t in self._waiting if t <= covers]:
+            asked = self._waiting.pop(ticket)
+            self._outcomes[ticket] = (outcome, result) if asked is job else ("superseded", None)
+        while len(self._outcomes) > SCAN_OUTCOMES_KEPT: self._outcomes.popitem(last=False)
+        self._done.notify_all()
+
+    def _notify(self, callbacks, *args):
+        for callback in list(callbacks):
+            try: callback(*args)
+            except Exception as e: log_message(f"Scan-Callback Fehler: {e}", level="WARNING")
+
+    def report(self):
+        s = self.stats
+        avg = s["scan_seconds"] / s["executed"] if s["executed"] else 0.0
+        # Zusammengefasste Auslöser sparen einen ganzen Scan, abgelöste den Rest ihrer Laufzeit
+        saved = s["coalesced"] * avg + max(0.0, s["superseded"] * avg - s["cancelled_seconds"])
+        return (f"Scans: {s['triggers']} Auslöser, {s['executed']} ausgeführt, {s['coalesced']} zusammengefasst, "
+                f"{s['superseded']} abgelöst, {s['failed']} Fehler (~{saved:.1f}s Arbeit gespart)")
 
 class CoreEngine:
     def __init__(self):
-        self.config = load_config()
-        self.ocr_extractor = OCRExtractor(self.config)
-        self.tts_service = TTSService(self.config)
-        self.voices = []
+        self.config_store = ConfigStore()
         self.cache_dir = os.path.join(os.getcwd(), "AudioCache")
-        if not os.path.exists(self.cache_dir): os.makedirs(self.cache_dir)
-        threading.Thread(target=self._clean_cache, daemon=True).start()
+        self.audio_cache = AudioCache(self.cache_dir, MAX_CACHE_SIZE_BYTES)
+        self.models = ModelManager()
+        self.models.configure(self.config)
+        # Die Konstruktoren laden nichts Schweres mehr - die Backends startet start_backends()
+        with startup_profile.measure("init", "OCRExtractor"): self.ocr_extractor = OCRExtractor(self.config, self.models)
+        with startup_profile.measure("init", "TTSService"): self.tts_service = TTSService(self.config, self.audio_cache, self.models)
+        self.config_store.start_watching()
+        self.voices = []
+        self.corrector = TextCorrector()
+        self.backend_status = {}
+        self._status_callbacks = []
+        self.scheduler = ScanScheduler(lambda cancel: self.run_pipeline(cancel=cancel))
+        self.services_started = False
+        self._services_lock = threading.Lock()
+
+    def start_services(self):
+        """Hintergrund-Dienste (Config-Listener, Cache-Limit, Stimmen, Modell-Pflege). Einmalig.
+
+        Die GUI als Daemon-Client ruft das nie auf - sonst liefe alles doppelt neben dem Daemon
+        (zweiter Cache-Aufräumer auf derselben index.json, XTTS-Vorladen beim Stimmenwechsel).
+        """
+        with self._services_lock:
+            if self.services_started: return
+            self.services_started = True
+        self.config_store.subscribe(self.models.configure, keys=("model_idle_timeout", "model_memory_budget_mb"))
+        self.config_store.subscribe(self.ocr_extractor.on_config_changed)
+        self.config_store.subscribe(self.tts_service.on_config_changed)
+        self.config_store.subscribe(self._on_voice_config_changed, keys=("api_key",))
+        # Snapshot nachreichen, falls sich die Config seit dem Konstruktor geändert hat
+        self.models.configure(self.config)
+        self.ocr_extractor.on_config_changed(self.config, frozenset())
+        self.tts_service.on_config_changed(self.config, frozenset())
+        threading.Thread(target=self.audio_cache.enforce_limit, daemon=True).start()
         threading.Thread(target=self.fetch_voices, daemon=True).start()
+        self.models.start()
+        threading.Thread(target=self._watch_game_log, name="LogActivity", daemon=True).start()
+
+    @property
+    def config(self):
+        """Aktueller, unveränderlicher Config-Snapshot."""
+        return self.config_store.snapshot
 
-    def _clean_cache(self):
-        total_size = 0; file_details = []
-        for root, _, files in os.walk(self.cache_dir):
-            for name in files:
-                filepath = os.path.join(root, name)
-                if os.path.exists(filepath):
-                    stat = os.stat(filepath); total_size += stat.st_size; file_details.append((filepath, stat.st_mtime))
-        if total_size > MAX_CACHE_SIZE_BYTES:
-            file_details.sort(key=lambda x: x[1])
-            for filepath, _ in file_details:
-                if total_size <= MAX_CACHE_SIZE_BYTES: break
-                try: size = os.path.getsize(filepath); os.remove(filepath); total_size -= size
-                except: pass
+    def update_config(self, changes):
+        return self.config_store.update(changes)
+
+    # --- BACKENDS ---
+    def start_backends(self):
+        """Bereitet die laut Config gewählten Backends nacheinander im Hintergrund vor."""
+        self.start_services()
+        threading.Thread(target=self._init_backends, name="BackendInit", daemon=True).start()
+
+    def subscribe_backend_status(self, callback):
+        """callback(name, zustand) - Zustände: wartet, lädt, bereit, Fehler. Läuft im Init-Thread."""
+        self._status_callbacks.append(callback)
+
+    def _set_backend_status(self, name, state):
+        self.backend_status[name] = state
+        for callback in list(self._status_callbacks):
+            try: callback(name, state)
+            except Exception as e: log_message(f"Status-Callback Fehler: {e}", level="WARNING")
+
+    def _init_backends(self):
+        steps = self.ocr_extractor.backend_steps() + [("Wörterbuch", self.corrector.initialize)] + self.tts_service.backend_steps()
+        for name, _ in steps: self._set_backend_status(name, "wartet")
+        for name, init in steps:
+            self._set_backend_status(name, "lädt")
+            with startup_profile.measure("init", name):
+                try: ok = init() is not False
+                except Exception as e:
+                    log_message(f"Backend {name} nicht gestartet: {e}", level="ERROR"); ok = False
+            self._set_backend_status(name, "bereit" if ok else "Fehler")
+        startup_profile.finish()
+
+    def _watch_game_log(self, interval=2.0):
+        """Neue Zeilen im LOTRO-Log = Spieler ist aktiv: entladene Modelle schon mal vorladen."""
+        last_size = None
+        while True:
+            time.sleep(interval)
+            try: size = os.path.getsize(self.config.get("lotro_log_path", ""))
+            except OSError: last_size = None; continue
+            if last_size is not None and size > last_size: self.models.on_activity()
+            last_size = size
+
+    def _on_voice_config_changed(self, snapshot, changed):
+        threading.Thread(target=self.fetch_voices, daemon=True).start()
 
     def fetch_voices(self):
         self.voices = self.tts_service.fetch_voices(); return self.voices
@@ -53,30 +248,61 @@ class CoreEngine:
         mapping[npc_name] = vid; save_mapping(mapping)
         return vid, "Berechnet"
 
-    def run_pipeline(self, skip_audio=False):
+    def run_pipeline(self, skip_audio=False, cancel=None):
+        """Ein kompletter Scan. Mit cancel (CancelToken) endet er per ScanCancelled, sobald er abgelöst wird."""
+        # Hotkey/Scan: XTTS o.ä. lädt im Hintergrund nach, während die OCR läuft
+        self.models.on_activity()
         # 1. OCR mit Quellen-Info
         # Änderung: Wir entpacken das Tuple (text, source)
-        txt, source = self.ocr_extractor.run_ocr()
+        txt, source = self.ocr_extractor.run_ocr(cancel)
+        if cancel: cancel.check()
         
         if not txt or len(txt) < 5 or "Kein Text" in txt:
             return txt, source
 
+        # 1b. Nachkorrektur (Umlaute, verwechselte Zeichen) - stabilere Cache-Keys, weniger Synthesen
+        if self.config.get("ocr_correction", False):
+            txt = self.corrector.correct(txt)
+            self.corrector.learn(txt, trusted=source.startswith("Gemini"))
+
         if skip_audio:
             return txt, source
 
         # 2. TTS
-        npc_log, gender = self.get_npc_from_log()
-        name = npc_log if npc_log != "Unknown" else "Unknown"
-        vid, method = self.select_voice(name, gender)
+        self.speak(txt, cancel=cancel)
+        
+        # Gebe Text und Quelle zurück
+        return txt, source
+
+    def request_scan(self, reason="manuell", skip_audio=False):
+        """Scan über den Scheduler; liefert die Nummer für scheduler.wait()."""
+        if not skip_audio: return self.scheduler.trigger(reason)
+        return self.scheduler.trigger(reason, job=lambda cancel: self.run_pipeline(skip_audio=True, cancel=cancel))
+
+    def request_speak(self, text, **voice):
+        """Vorlesen über den Scheduler: löst einen laufenden Scan ab wie ein neuer Hotkey und umgekehrt."""
+        def job(cancel):
+            cancel.mark_captured()  # Text steht fest - ein neuer Auslöser bricht das Vorlesen ab
+            self.speak(text, cancel=cancel, **voice)
+            return text, "Vorlesen"
+        return self.scheduler.trigger("Vorlesen", job=job)
 
-        delay = float(self.config.get("audio_delay", 0.5))
-        cache_key = f"{txt}_{vid}" 
+    def speak(self, text, npc_name=None, gender="Unknown", voice_id=None, delay=None, cancel=None):
+        """Liest text vor (Cache oder Synthese). Ohne npc_name kommt der NPC aus dem LOTRO-Log."""
+        if npc_name is None: npc_name, gender = self.get_npc_from_log()
+        if voice_id: method = "vorgegeben"
+        else: voice_id, method = self.select_voice(npc_name, gender)
+        if delay is None: delay = self.config.audio_delay
+        cache_key = f"{text}_{voice_id}" 
         text_hash = hashlib.md5(cache_key.encode('utf-8')).hexdigest()
-        cache_file = os.path.join(self.cache_dir, f"quest_{text_hash}.mp3")
 
         self.tts_service.generate_and_play(
-            text=txt, voice_id=vid, cache_file=cache_file, delay=delay, name=name, method=method
+            text=text, voice_id=voice_id, cache_key=text_hash, delay=delay, name=npc_name, method=method, cancel=cancel
         )
-        
-        # Gebe Text und Quelle zurück
-        return txt, source
+
+    def metrics(self):
+        """Kennzahlen aller Dienste (Status-Anzeige, Daemon-API)."""
+        return {"backends": dict(self.backend_status), "scans": dict(self.scheduler.stats),
+                "reports": [self.scheduler.report(), self.models.report(), self.audio_cache.report(),
+                            self.tts_service.xtts_report(), self.ocr_extractor.hybrid_report(), self.corrector.report()],
+                "startup": startup_profile.report()}
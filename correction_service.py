@@ -0,0 +1,360 @@
+import os
+import re
+import mmap
+import json
+import zlib
+import time
+import struct
+import atexit
+import threading
+from utils import log_message, load_mapping, LazyModule
+
+np = LazyModule("numpy")  # erst im Hintergrund-Init gebraucht, nicht beim Programmstart
+
+# Nachkorrektur für OCR-Text nach dem Symmetric-Delete-Verfahren (SymSpell):
+# Für jedes Wörterbuchwort werden vorab alle Löschvarianten (bis Distanz 2, auf einem Präfix)
+# abgelegt. Bei der Suche erzeugt man dieselben Löschvarianten des Tokens - ein paar Dutzend
+# Hash-Lookups statt eines Vergleichs mit dem ganzen Wörterbuch.
+#
+# Korrigiert wird nur gegen ein Lexikon im Ordner "lexicon" (*.txt, "wort" oder "wort anzahl" pro
+# Zeile, z.B. deutsche/englische Häufigkeitslisten) - ohne Lexikon bleibt der Text unverändert.
+# NPC-Namen aus voice_mapping.json und Wörter aus vergangenen Scans (Gemini sofort, EasyOCR erst
+# nach mehrfachem Auftreten) gelten nur als bekannt: sie werden nie verändert, aber auch nie als
+# Ersatz vorgeschlagen - sonst würden wiederholte Fehllesungen zu "richtigen" Wörtern.
+CORRECTION_INDEX_FILE = "correction_index.bin"
+CORRECTION_PENDING_FILE = "correction_pending.json"
+CORRECTION_LEXICON_DIR = "lexicon"
+CORRECTION_MAGIC = b"LVSYM2\0\0"
+CORRECTION_HEADER = struct.Struct("<8sIIBBxxIII")  # + Anzahl Lexikon-Wörter, Lexikon-Signatur
+CORRECTION_LEARN_MIN_COUNT = 3
+CORRECTION_MIN_FREQ = 5  # Lexikon-Wörter seltener als das werden nicht vorgeschlagen (Zeilen ohne Anzahl zählen so viel)
+CORRECTION_COMPACT_AT = 2000
+CORRECTION_SAVE_INTERVAL = 300
+
+_WORD_SPLIT = re.compile(r"([^\W\d_]+)")
+# EasyOCR verliert oft Umlaut-Punkte und liest ß als ss - das wären sonst 2-3 Edits
+_UMLAUT_FOLD = str.maketrans({"ä": "a", "ö": "o", "ü": "u", "ß": "ss"})
+
+def _delete_variants(word, max_distance, prefix_length):
+    word = word[:prefix_length]
+    result = {word}
+    frontier = {word}
+    for _ in range(max_distance):
+        nxt = set()
+        for w in frontier:
+            if len(w) <= 1: continue
+            for i in range(len(w)): nxt.add(w[:i] + w[i+1:])
+        nxt -= result
+        result |= nxt
+        frontier = nxt
+    return result
+
+def _delete_hash(text):
+    return zlib.crc32(text.encode("utf-8"))
+
+def edit_distance(a, b, limit):
+    """Damerau-Levenshtein (OSA) mit Abbruch, sobald limit sicher überschritten ist."""
+    if a == b: return 0
+    la, lb = len(a), len(b)
+    if abs(la - lb) > limit: return limit + 1
+    prev2 = None
+    prev = list(range(lb + 1))
+    for i in range(1, la + 1):
+        cur = [i] + [0] * lb
+        row_min = i
+        for j in range(1, lb + 1):
+            cost = 0 if a[i-1] == b[j-1] else 1
+            v = min(prev[j] + 1, cur[j-1] + 1, prev[j-1] + cost)
+            if i > 1 and j > 1 and a[i-1] == b[j-2] and a[i-2] == b[j-1]: v = min(v, prev2[j-2] + 1)
+            cur[j] = v
+            if v < row_min: row_min = v
+        if row_min > limit: return limit + 1
+        prev2, prev = prev, cur
+    return prev[lb]
+
+class SymSpellIndex:
+    """Wörterbuch + Löschvarianten-Index.
+
+    Die ersten n_lexicon Wörter stammen aus dem Lexikon; nur sie haben Löschvarianten und können
+    vorgeschlagen werden. Danach folgen gelernte Wörter, die nur als bekannt gelten. Die sortierte
+    Hash-Tabelle der Löschvarianten liegt memory-mapped in CORRECTION_INDEX_FILE.
+    """
+    def __init__(self, path=CORRECTION_INDEX_FILE, max_distance=2, prefix_length=7):
+        self.path = path
+        self.max_distance = max_distance
+        self.prefix_length = prefix_length
+        self.words = []
+        self.freqs = []
+        self.word_ids = {}
+        self.folded = {}
+        self.n_lexicon = 0
+        self.lexicon_signature = 0
+        self.delta_words = 0
+        self._delta = {}
+        self._hashes = None
+        self._ids = None
+        self._file = None
+        self._mmap = None
+        self._lock = threading.RLock()
+
+    def __contains__(self, word): return word in self.word_ids
+    def __len__(self): return len(self.words)
+
+    def add_word(self, word, count=1, lexicon=False):
+        """Zählt ein Wort. lexicon=True nur beim Aufbau, bevor gelernte Wörter dazukommen."""
+        with self._lock:
+            wid = self.word_ids.get(word)
+            if wid is not None:
+                self.freqs[wid] += count; return
+            if lexicon and self.n_lexicon != len(self.words): raise ValueError("Lexikon-Wörter vor gelernten Wörtern einfügen")
+            wid = len(self.words)
+            self.words.append(word); self.freqs.append(count); self.word_ids[word] = wid
+            self.delta_words += 1
+            if not lexicon: return
+            self.n_lexicon += 1
+            self._add_folded(word, wid)
+            for d in _delete_variants(word, self.max_distance, self.prefix_length):
+                self._delta.setdefault(d, []).append(wid)
+
+    def is_lexicon(self, word):
+        wid = self.word_ids.get(word)
+        return wid is not None and wid < self.n_lexicon
+
+    def learned_words(self):
+        with self._lock: return list(zip(self.words[self.n_lexicon:], self.freqs[self.n_lexicon:]))
+
+    def _add_folded(self, word, wid):
+        key = word.translate(_UMLAUT_FOLD)
+        if key == word: return
+        other = self.folded.get(key)
+        if other is None or self.freqs[other] < self.freqs[wid]: self.folded[key] = wid
+
+    def lookup(self, word, max_distance=None):
+        """Liefert (bestes_wort, distanz) oder (None, None)."""
+        if word in self.word_ids: return word, 0
+        # Umlaut-Faltung nur von Lexikon-Wort zu Lexikon-Wort ("schon" bleibt "schon")
+        wid = self.folded.get(word.translate(_UMLAUT_FOLD))
+        if wid is not None and self.freqs[wid] >= CORRECTION_MIN_FREQ: return self.words[wid], 1
+        max_d = self.max_distance if max_distance is None else min(max_distance, self.max_distance)
+        variants = _delete_variants(word, max_d, self.prefix_length)
+        with self._lock:
+            candidates = set()
+            for d in variants: candidates.update(self._delta.get(d, ()))
+            if self._hashes is not None and len(self._hashes):
+                hs = np.fromiter((_delete_hash(d) for d in variants), dtype=np.uint32, count=len(variants))
+                lo = np.searchsorted(self._hashes, hs, side="left")
+                hi = np.searchsorted(self._hashes, hs, side="right")
+                for a, b in zip(lo.tolist(), hi.tolist()):
+                    if b > a: candidates.update(self._ids[a:b].tolist())
+            best, best_key = None, None
+            for wid in candidates:
+                if wid >= self.n_lexicon or self.freqs[wid] < CORRECTION_MIN_FREQ: continue
+                cand = self.words[wid]
+                dist = edit_distance(word, cand, max_d)
+                if dist > max_d: continue
+                key = (dist, -self.freqs[wid])
+                if best_key is None or key < best_key: best, best_key = cand, key
+        return (best, best_key[0]) if best is not None else (None, None)
+
+    # --- Persistenz ---
+    def load(self):
+        if not os.path.exists(self.path): return False
+        f = mm = None
+        try:
+            f = open(self.path, "rb")
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            magic, n_words, n_deletes, max_d, prefix, words_bytes, n_lexicon, signature = CORRECTION_HEADER.unpack_from(mm, 0)
+            if magic != CORRECTION_MAGIC: raise ValueError("Unbekanntes Format")
+            offset = CORRECTION_HEADER.size
+            blob = mm[offset:offset + words_bytes].decode("utf-8")
+            offset += words_bytes + (-words_bytes % 4)
+            freqs = np.frombuffer(mm, dtype=np.uint32, count=n_words, offset=offset).tolist()
+            offset += 4 * n_words
+            hashes = np.frombuffer(mm, dtype=np.uint32, count=n_deletes, offset=offset)
+            ids = np.frombuffer(mm, dtype=np.uint32, count=n_deletes, offset=offset + 4 * n_deletes)
+        except Exception as e:
+            log_message(f"Korrektur-Index nicht lesbar, baue neu: {e}", level="WARNING")
+            try:
+                if mm is not None: mm.close()
+            except BufferError: pass
+            if f is not None: f.close()
+            return False
+        with self._lock:
+            self._close_mapping()
+            self.max_distance, self.prefix_length = max_d, prefix
+            self.words = blob.split("\n") if n_words else []
+            self.freqs = freqs
+            self.word_ids = {w: i for i, w in enumerate(self.words)}
+            self.n_lexicon, self.lexicon_signature = n_lexicon, signature
+            self.folded = {}
+            for i, w in enumerate(self.words[:n_lexicon]): self._add_folded(w, i)
+            self._hashes, self._ids, self._file, self._mmap = hashes, ids, f, mm
+            self._delta = {}; self.delta_words = 0
+        return True
+
+    def save(self):
+        """Schreibt Wörterbuch und kompletten Löschindex neu (inkl. Delta) und mappt ihn neu ein."""
+        with self._lock:
+            words, freqs, n_lexicon = list(self.words), list(self.freqs), self.n_lexicon
+        hashes, ids = [], []
+        for wid, word in enumerate(words[:n_lexicon]):
+            for d in _delete_variants(word, self.max_distance, self.prefix_length):
+                hashes.append(_delete_hash(d)); ids.append(wid)
+        hashes = np.asarray(hashes, dtype=np.uint32); ids = np.asarray(ids, dtype=np.uint32)
+        order = np.lexsort((ids, hashes))
+        hashes, ids = hashes[order], ids[order]
+        blob = "\n".join(words).encode("utf-8")
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(CORRECTION_HEADER.pack(CORRECTION_MAGIC, len(words), len(hashes), self.max_distance, self.prefix_length,
+                                           len(blob), n_lexicon, self.lexicon_signature))
+            f.write(blob); f.write(b"\0" * (-len(blob) % 4))
+            f.write(np.asarray(freqs, dtype=np.uint32).tobytes())
+            f.write(hashes.tobytes()); f.write(ids.tobytes())
+        with self._lock:
+            added_since = list(zip(self.words[len(words):], self.freqs[len(words):]))
+            counts_since = self.freqs[:len(words)]
+            self._close_mapping()  # Windows: gemappte Datei lässt sich nicht ersetzen
+            os.replace(tmp_path, self.path)
+            self.load()
+            # Während des Schreibens gelernte Wörter und Zählerstände wieder einspielen
+            self.freqs[:len(counts_since)] = counts_since
+            for word, count in added_since: self.add_word(word, count)
+
+    def _close_mapping(self):
+        self._hashes = self._ids = None
+        if self._mmap is not None:
+            try: self._mmap.close()
+            except BufferError: pass  # noch referenziert - wird vom GC freigegeben
+        if self._file is not None: self._file.close()
+        self._mmap = self._file = None
+
+class TextCorrector:
+    """Korrigiert OCR-Text tokenweise gegen den SymSpellIndex und lernt aus neuen Scans."""
+    def __init__(self, index_path=CORRECTION_INDEX_FILE, pending_path=CORRECTION_PENDING_FILE):
+        self.index = SymSpellIndex(index_path)
+        self.pending_path = pending_path
+        self.pending = {}
+        self.ready = False
+        self._dirty = False
+        self._last_save = time.monotonic()
+        self._save_lock = threading.Lock()
+        self.stats = {"dialogs": 0, "tokens": 0, "corrected": 0, "seconds": 0.0}
+
+    def initialize(self):
+        """Lädt (oder baut) den Index. Läuft im Hintergrund; bis dahin bleibt Text unverändert."""
+        start = time.perf_counter()
+        signature = self._lexicon_signature()
+        if not self.index.load() or self.index.lexicon_signature != signature:
+            # Neu oder Lexikon geändert: Lexikon neu einlesen, gelernte Wörter behalten
+            learned = self.index.learned_words()
+            self.index._close_mapping()
+            self.index = SymSpellIndex(self.index.path)
+            self._seed_from_lexicon()
+            self.index.lexicon_signature = signature
+            for word, count in learned: self.index.add_word(word, count)
+            self._dirty = True
+        try:
+            with open(self.pending_path, "r", encoding="utf-8") as f: self.pending = json.load(f)
+        except: self.pending = {}
+        self.learn_names(load_mapping().keys())
+        self.ready = True
+        atexit.register(self.save)
+        if not self.index.n_lexicon:
+            log_message(f"Kein Lexikon im Ordner '{CORRECTION_LEXICON_DIR}' - OCR-Korrektur bleibt aus.", level="WARNING")
+        log_message(f"Korrektur-Index bereit ({self.index.n_lexicon} Lexikon-Wörter, {len(self.index)} gesamt, "
+                    f"{time.perf_counter() - start:.2f}s).")
+
+    @staticmethod
+    def _lexicon_files():
+        if not os.path.isdir(CORRECTION_LEXICON_DIR): return []
+        return [os.path.join(CORRECTION_LEXICON_DIR, n) for n in sorted(os.listdir(CORRECTION_LEXICON_DIR)) if n.lower().endswith(".txt")]
+
+    def _lexicon_signature(self):
+        """Prüfsumme über Namen, Größe und Änderungszeit der Lexikon-Dateien."""
+        parts = []
+        for path in self._lexicon_files():
+            try: st = os.stat(path)
+            except OSError: continue
+            parts.append(f"{os.path.basename(path)}:{st.st_size}:{st.st_mtime_ns}")
+        return zlib.crc32("|".join(parts).encode("utf-8"))
+
+    def _seed_from_lexicon(self):
+        for path in self._lexicon_files():
+            with open(path, "r", encoding="utf-8", errors="ignore") as f:
+                for line in f:
+                    parts = line.split()
+                    if not parts: continue
+                    count = int(parts[1]) if len(parts) > 1 and parts[1].isdigit() else CORRECTION_MIN_FREQ
+                    self.index.add_word(parts[0].lower(), count, lexicon=True)
+
+    @staticmethod
+    def _match_case(original, candidate):
+        if original.isupper() and len(original) > 1: return candidate.upper()
+        if original[0].isupper(): return candidate[0].upper() + candidate[1:]
+        return candidate
+
+    def correct(self, text):
+        # Ohne Lexikon gibt es nichts Verlässliches, wogegen korrigiert werden könnte
+        if not self.ready or not text or not self.index.n_lexicon: return text
+        start = time.perf_counter()
+        parts = _WORD_SPLIT.split(text)
+        corrected = 0
+        # Ungerade Indizes sind Wörter, gerade die Trenner dazwischen
+        for i in range(1, len(parts), 2):
+            word = parts[i]
+            if len(word) < 4: continue
+            lower = word.lower()
+            if lower in self.index: continue
+            cand, _ = self.index.lookup(lower, max_distance=1 if len(word) == 4 else 2)
+            if cand and cand != lower:
+                parts[i] = self._match_case(word, cand); corrected += 1
+        self.stats["dialogs"] += 1
+        self.stats["tokens"] += len(parts) // 2
+        self.stats["corrected"] += corrected
+        self.stats["seconds"] += time.perf_counter() - start
+        return "".join(parts) if corrected else text
+
+    def learn(self, text, trusted=False):
+        """Zählt Wörter eines Scans. trusted (z.B. Gemini): sofort ins Wörterbuch."""
+        if not self.ready: return
+        for word in _WORD_SPLIT.findall(text):
+            if len(word) < 3: continue
+            lower = word.lower()
+            if lower in self.index or trusted:
+                self.index.add_word(lower)
+            elif self.index.lookup(lower, max_distance=1)[0]:
+                continue  # liegt dicht an einem Lexikon-Wort - eher Lesefehler als neues Wort
+            else:
+                count = self.pending.get(lower, 0) + 1
+                if count >= CORRECTION_LEARN_MIN_COUNT:
+                    self.pending.pop(lower, None); self.index.add_word(lower, count)
+                else: self.pending[lower] = count
+        self._dirty = True
+        self.maybe_save()
+
+    def learn_names(self, names):
+        for name in names:
+            for part in _WORD_SPLIT.findall(name):
+                if len(part) >= 3 and part.lower() not in self.index: self.index.add_word(part.lower())
+
+    def maybe_save(self):
+        due = time.monotonic() - self._last_save > CORRECTION_SAVE_INTERVAL
+        if self._dirty and (due or self.index.delta_words >= CORRECTION_COMPACT_AT):
+            threading.Thread(target=self.save, daemon=True).start()
+
+    def save(self):
+        if not self._dirty or not self._save_lock.acquire(blocking=False): return
+        try:
+            self._last_save = time.monotonic()
+            self._dirty = False
+            self.index.save()
+            with open(self.pending_path, "w", encoding="utf-8") as f: json.dump(self.pending, f)
+        except Exception as e:
+            log_message(f"Korrektur-Index nicht gespeichert: {e}", level="ERROR")
+        finally: self._save_lock.release()
+
+    def report(self):
+        s = self.stats
+        avg = 1000 * s["seconds"] / s["dialogs"] if s["dialogs"] else 0.0
+        return f"Korrektur: {s['corrected']}/{s['tokens']} Wörter in {s['dialogs']} Dialogen, Ø {avg:.2f} ms/Dialog"
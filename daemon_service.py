@@ -0,0 +1,305 @@
+import io
+import os
+import json
+import base64
+import time
+import threading
+import collections
+import urllib.request
+import urllib.error
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+from utils import log_message, startup_profile
+from core import CoreEngine
+
+# Headless-Betrieb: die CoreEngine läuft ohne Tk-Fenster, die Modelle bleiben warm. Gesteuert wird
+# über eine kleine JSON-API auf localhost - von Overlays, Stream-Deck-Tasten, Skripten oder der GUI.
+DAEMON_HOST = "127.0.0.1"
+DAEMON_STATE_FILE = "daemon.json"   # PID + Port des laufenden Daemons, damit die GUI ihn findet
+DAEMON_EVENT_TIMEOUT = 25           # Long-Poll für /events (Sekunden)
+DAEMON_LATENCY_SAMPLES = 200
+
+class DaemonService:
+    """JSON-API über einer CoreEngine (scheduler, speak, tts_service, ocr_extractor, metrics, backend_status)."""
+    def __init__(self, engine, port, host=DAEMON_HOST, allow_shutdown=False):
+        self.engine = engine
+        self.allow_shutdown = allow_shutdown
+        self.httpd = ThreadingHTTPServer((host, port), DaemonRequestHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.service = self
+        self.port = self.httpd.server_address[1]  # Port 0 = frei wählen (Benchmark)
+        self.hotkey_hook = None
+        self._thread = None
+        self._cond = threading.Condition()
+        self.version = 0
+        self.state = "idle"
+        self.scans = 0
+        self.last_scan = None
+        self._latency = {}
+        engine.scheduler.subscribe(on_result=self._on_scan_result, on_state=self._on_scan_state)
+        engine.subscribe_backend_status(lambda name, state: self._bump())
+
+    # --- Ereignisse für /events ---
+    def _bump(self, **changes):
+        with self._cond:
+            for key, value in changes.items(): setattr(self, key, value)
+            self.version += 1
+            self._cond.notify_all()
+
+    def _on_scan_result(self, text, source):
+        self._bump(scans=self.scans + 1, last_scan={"text": text, "source": source, "time": time.time()})
+
+    def _on_scan_state(self, state):
+        self._bump(state=state)
+
+    def snapshot(self):
+        with self._cond:
+            return {"version": self.version, "state": self.state, "scans": self.scans, "last_scan": self.last_scan,
+                    "backends": dict(self.engine.backend_status)}
+
+    # --- Hotkey ---
+    def enable_hotkey(self):
+        """Globaler Hotkey auch ohne Fenster; folgt Änderungen an config.json."""
+        self._register_hotkey()
+        self.engine.config_store.subscribe(lambda snap, changed: self._register_hotkey(), keys=("hotkey",))
+
+    def _register_hotkey(self):
+        try: import keyboard
+        except Exception as e:
+            log_message(f"Kein Hotkey im Daemon ({e}) - Scans nur über die API.", level="WARNING"); return
+        if self.hotkey_hook is not None:
+            try: keyboard.remove_hotkey(self.hotkey_hook)
+            except: pass
+            self.hotkey_hook = None
+        hotkey = self.engine.config.get("hotkey", "ctrl+alt+s")
+        try:
+            self.hotkey_hook = keyboard.add_hotkey(hotkey, lambda: self.engine.scheduler.trigger("Hotkey"))
+            log_message(f"Hotkey aktiv: {hotkey}")
+        except Exception as e:
+            log_message(f"Hotkey Fehler ({hotkey}): {e}", level="ERROR")
+
+    # --- Routen (body: JSON bzw. Query-Parameter) -> (status, antwort) ---
+    def api_status(self, body):
+        return 200, dict(self.snapshot(), pid=os.getpid(), port=self.port, hotkey=self.hotkey_hook is not None)
+
+    def api_events(self, body):
+        """Long-Poll: antwortet, sobald sich etwas gegenüber Version after geändert hat."""
+        after = int(body.get("after", -1))
+        timeout = min(float(body.get("timeout", DAEMON_EVENT_TIMEOUT)), DAEMON_EVENT_TIMEOUT)
+        with self._cond: self._cond.wait_for(lambda: self.version != after, timeout)
+        return 200, self.snapshot()
+
+    def api_scan(self, body):
+        skip_audio = bool(body.get("skip_audio"))
+        # Test-Scan der GUI: gerade gespeicherte Paddings sofort übernehmen, nicht erst beim nächsten Polling
+        if skip_audio: self.engine.config_store.reload()
+        ticket = self.engine.request_scan("API", skip_audio=skip_audio)
+        if not body.get("wait"): return 202, {"ticket": ticket}
+        state, result = self.engine.scheduler.wait(ticket, float(body.get("timeout", 30)))
+        if state == "timeout": return 504, {"ticket": ticket, "error": "Scan nicht rechtzeitig fertig"}
+        if state == "superseded": return 409, {"ticket": ticket, "error": "Scan durch einen neueren Auftrag abgelöst"}
+        if result is None: return 500, {"ticket": ticket, "error": "Scan fehlgeschlagen"}
+        return 200, {"ticket": ticket, "text": result[0], "source": result[1]}
+
+    def api_speak(self, body):
+        text = str(body.get("text", "")).strip()
+        if not text: return 400, {"error": "text fehlt"}
+        # Über den Scheduler: nie parallel zu einem Scan, ein neuer Hotkey bricht das Vorlesen ab
+        ticket = self.engine.request_speak(text, npc_name=body.get("npc"), gender=body.get("gender", "Unknown"),
+                                           voice_id=body.get("voice_id"), delay=0)
+        if not body.get("wait"): return 202, {"ticket": ticket}
+        state, result = self.engine.scheduler.wait(ticket, float(body.get("timeout", 120)))
+        if state == "timeout": return 504, {"ticket": ticket, "error": "Vorlesen nicht rechtzeitig fertig"}
+        if state == "superseded": return 409, {"ticket": ticket, "error": "Vorlesen durch einen neueren Auftrag abgebrochen"}
+        if result is None: return 500, {"ticket": ticket, "error": "Vorlesen fehlgeschlagen"}
+        return 200, {"ticket": ticket}
+
+    def api_previews(self, body):
+        """Neueste Debug-Vorschauen (nur im Debug-Modus) als JPEG/Base64 - die GUI als Client hat keine eigenen."""
+        from PIL import Image
+        frames = {}
+        for slot, frame in self.engine.ocr_extractor.previews.drain().items():
+            buf = io.BytesIO()
+            Image.fromarray(frame).save(buf, "JPEG", quality=85)
+            frames[slot] = base64.b64encode(buf.getvalue()).decode("ascii")
+        return 200, {"frames": frames}
+
+    def api_reload_templates(self, body):
+        """Die GUI hat neue Templates kalibriert - sonst sähe der Daemon sie erst nach einem Neustart."""
+        return 200, {"loaded": self.engine.ocr_extractor.reload_templates()}
+
+    def api_pause(self, body):
+        self.engine.tts_service.toggle_pause()
+        return 200, {}
+
+    def api_metrics(self, body):
+        return 200, dict(self.engine.metrics(), api=self.latency_report())
+
+    def api_shutdown(self, body):
+        if not self.allow_shutdown: return 403, {"error": "Beenden nur im Daemon-Modus"}
+        threading.Thread(target=self.httpd.shutdown, daemon=True).start()
+        return 200, {}
+
+    # --- Latenz ---
+    def record_latency(self, path, seconds):
+        if path == "/events": return  # Long-Poll, wartet absichtlich
+        with self._cond:
+            self._latency.setdefault(path, collections.deque(maxlen=DAEMON_LATENCY_SAMPLES)).append(seconds)
+
+    def latency_report(self):
+        """Serverseitige Bearbeitungszeit je Route in ms (p50/p95 der letzten Anfragen)."""
+        with self._cond: samples = {path: sorted(values) for path, values in self._latency.items()}
+        return {path: {"n": len(v), "p50_ms": round(v[len(v) // 2] * 1000, 2), "p95_ms": round(v[int(len(v) * 0.95)] * 1000, 2)}
+                for path, v in samples.items()}
+
+    # --- Server ---
+    def start(self):
+        """Bedient die API in einem Hintergrund-Thread."""
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name="DaemonAPI", daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self):
+        self.httpd.serve_forever()
+
+    def close(self):
+        if self._thread is not None: self.httpd.shutdown()
+        self.httpd.server_close()
+
+DAEMON_ROUTES = {
+    ("GET", "/status"): DaemonService.api_status,
+    ("GET", "/events"): DaemonService.api_events,
+    ("GET", "/metrics"): DaemonService.api_metrics,
+    ("GET", "/previews"): DaemonService.api_previews,
+    ("POST", "/scan"): DaemonService.api_scan,
+    ("POST", "/speak"): DaemonService.api_speak,
+    ("POST", "/templates/reload"): DaemonService.api_reload_templates,
+    ("POST", "/pause"): DaemonService.api_pause,
+    ("POST", "/shutdown"): DaemonService.api_shutdown,
+}
+
+class DaemonRequestHandler(BaseHTTPRequestHandler):
+    """Verteilt Anfragen auf DAEMON_ROUTES. Antworten sind immer JSON."""
+    server_version = "LotroVoiceDaemon/1.0"
+
+    def do_GET(self): self._dispatch("GET")
+
+    def do_POST(self): self._dispatch("POST")
+
+    def _dispatch(self, method):
+        start = time.perf_counter()
+        service = self.server.service
+        url = urlparse(self.path)
+        try:
+            status, payload = self._route(method, url, service)
+        except (ValueError, TypeError) as e: status, payload = 400, {"error": str(e)}
+        except Exception as e:
+            log_message(f"API Fehler ({method} {url.path}): {e}", level="ERROR")
+            status, payload = 500, {"error": str(e)}
+        self._send(status, payload)
+        service.record_latency(url.path, time.perf_counter() - start)
+
+    def _route(self, method, url, service):
+        length = int(self.headers.get("Content-Length") or 0)
+        raw = self.rfile.read(length) if length else b""
+        # Nur Anfragen an localhost (gegen DNS-Rebinding) und POST nur als JSON: eine Webseite im
+        # Browser kann beides nicht ohne CORS-Preflight schicken, den wir nie beantworten.
+        host = (self.headers.get("Host") or "").rsplit(":", 1)[0]
+        if host not in ("127.0.0.1", "localhost"): return 403, {"error": "Nur localhost"}
+        if method == "POST":
+            if self.headers.get("Content-Type", "").split(";")[0].strip() != "application/json":
+                return 415, {"error": "Content-Type application/json erwartet"}
+            body = json.loads(raw) if raw else {}
+            if not isinstance(body, dict): raise ValueError("JSON-Objekt erwartet")
+        else: body = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        route = DAEMON_ROUTES.get((method, url.path))
+        if route is None: return 404, {"error": f"Unbekannt: {method} {url.path}"}
+        return route(service, body)
+
+    def _send(self, status, payload):
+        data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        # http.server schreibt sonst jede Anfrage nach stderr
+        log_message(f"API {format % args}", level="DEBUG")
+
+class DaemonClient:
+    """Client für die Daemon-API (GUI, Skripte, Benchmark)."""
+    def __init__(self, port, host=DAEMON_HOST, timeout=5.0):
+        self.base = f"http://{host}:{port}"
+        self.timeout = timeout
+
+    def request(self, method, path, body=None, timeout=None):
+        data = json.dumps(body or {}).encode("utf-8") if method == "POST" else None
+        req = urllib.request.Request(self.base + path, data=data, method=method, headers={"Content-Type": "application/json"})
+        try:
+            with urllib.request.urlopen(req, timeout=timeout or self.timeout) as resp: return json.loads(resp.read())
+        except urllib.error.HTTPError as e:
+            try: message = json.loads(e.read()).get("error", "")
+            except: message = ""
+            raise RuntimeError(f"Daemon: {e.code} {message}".strip())
+
+    def ping(self):
+        try: return self.status(timeout=1.0)
+        except: return None
+
+    def status(self, timeout=None): return self.request("GET", "/status", timeout=timeout)
+
+    def events(self, after=-1, timeout=DAEMON_EVENT_TIMEOUT):
+        return self.request("GET", f"/events?after={after}&timeout={timeout}", timeout=timeout + 5)
+
+    def metrics(self): return self.request("GET", "/metrics")
+
+    def scan(self, wait=False, timeout=30, skip_audio=False):
+        return self.request("POST", "/scan", {"wait": wait, "timeout": timeout, "skip_audio": skip_audio},
+                            timeout=timeout + 5 if wait else None)
+
+    def speak(self, text, npc=None, voice_id=None, wait=False, timeout=120):
+        return self.request("POST", "/speak", {"text": text, "npc": npc, "voice_id": voice_id, "wait": wait, "timeout": timeout},
+                            timeout=timeout + 5 if wait else None)
+
+    def previews(self):
+        """{slot: JPEG-Bytes} der seit dem letzten Abruf neuen Debug-Vorschauen."""
+        return {slot: base64.b64decode(data) for slot, data in self.request("GET", "/previews")["frames"].items()}
+
+    def reload_templates(self): return self.request("POST", "/templates/reload")
+
+    def pause(self): return self.request("POST", "/pause")
+
+    def shutdown(self): return self.request("POST", "/shutdown")
+
+def find_daemon():
+    """(client, status) des laufenden Daemons laut daemon.json oder None. Ohne Datei kein Netzwerkzugriff."""
+    try:
+        with open(DAEMON_STATE_FILE, "r", encoding="utf-8") as f: port = json.load(f)["port"]
+    except: return None
+    client = DaemonClient(port)
+    status = client.ping()
+    return (client, status) if status else None
+
+def run_daemon(port=None, hotkey=True):
+    """Headless-Einstieg (main.py --daemon): Engine ohne Fenster, Backends sofort vorladen."""
+    with startup_profile.measure("init", "CoreEngine"): engine = CoreEngine()
+    if port is None: port = int(engine.config.get("api_port", 8765))
+    try: service = DaemonService(engine, port, allow_shutdown=True)
+    except OSError as e:
+        log_message(f"Daemon-API Port {port} nicht verfügbar: {e}", level="ERROR"); return
+    if hotkey: service.enable_hotkey()
+    try:
+        with open(DAEMON_STATE_FILE, "w", encoding="utf-8") as f: json.dump({"pid": os.getpid(), "port": service.port}, f)
+    except Exception as e: log_message(f"{DAEMON_STATE_FILE} nicht geschrieben: {e}", level="WARNING")
+    startup_profile.mark("API bereit")
+    engine.start_backends()
+    log_message(f"Daemon läuft: http://{DAEMON_HOST}:{service.port} (Beenden: POST /shutdown oder Strg+C)")
+    try: service.serve_forever()
+    except KeyboardInterrupt: pass
+    finally:
+        service.close()
+        try: os.remove(DAEMON_STATE_FILE)
+        except OSError: pass
+        log_message("Daemon beendet.")
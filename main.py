@@ -1,14 +1,29 @@
+import time
+STARTUP_T0 = time.perf_counter()
 import tkinter as tk
 from tkinter import ttk, messagebox
-from PIL import Image, ImageTk 
+from PIL import Image, ImageTk, ImageEnhance
 import threading
+import math
+from collections import OrderedDict
 import os
-import cv2
-import numpy as np
+import io
+import sys
 import keyboard
 import ctypes
+import multiprocessing
+from utils import log_message, startup_profile, LazyModule
+startup_profile.begin(STARTUP_T0)
+startup_profile.record("import", "main (tkinter, PIL, keyboard)", time.perf_counter() - STARTUP_T0)
+_t_core = time.perf_counter()
 from core import CoreEngine
-from utils import save_config, log_message
+startup_profile.record("import", "core", time.perf_counter() - _t_core)
+from daemon_service import find_daemon, run_daemon
+
+# Nur für Kalibrierung und Screenshots gebraucht - nicht vor dem ersten Fenster laden
+cv2 = LazyModule("cv2")
+np = LazyModule("numpy")
+mss = LazyModule("mss")
 
 # --- LOTRO THEME COLORS ---
 COLOR_BG_DARK = "#1a1110"       # Hintergrund Schwarz/Braun
@@ -31,14 +46,21 @@ except:
     pass
 
 class DraggableRect:
-    """Klasse für die verschiebbaren Rahmen in der Kalibrierung."""
-    def __init__(self, canvas, x, y, size, name, label_text):
+    """Klasse für die verschiebbaren Rahmen in der Kalibrierung.
+
+    x, y, w, h sind Pixel im Original-Screenshot, gezeichnet wird mit dem Zoomfaktor der Ansicht.
+    Die Canvas-Items werden einmal angelegt und beim Ziehen nur per coords() verschoben.
+    """
+    HANDLE_SIZE = 15
+
+    def __init__(self, canvas, x, y, size, name, label_text, scale=1.0):
         self.canvas = canvas
         self.name = name
         self.x = x
         self.y = y
         self.w = size
         self.h = size
+        self.scale = scale
         
         self.tag_root = f"item_{name}"
         self.tag_rect = f"rect_{name}"
@@ -49,42 +71,205 @@ class DraggableRect:
     def draw(self):
         self.canvas.delete(self.tag_root)
         # Rahmen
-        self.canvas.create_rectangle(self.x, self.y, self.x+self.w, self.y+self.h, 
+        self.item_rect = self.canvas.create_rectangle(0, 0, 0, 0, 
                                      outline=COLOR_TEXT_GOLD, width=3, 
                                      fill="gray25", stipple="gray25", 
                                      tags=(self.tag_root, self.tag_rect))
         
         # Resize Handle (unten rechts)
-        handle_sz = 15
-        self.canvas.create_rectangle(self.x+self.w-handle_sz, self.y+self.h-handle_sz, 
-                                     self.x+self.w, self.y+self.h, 
+        self.item_handle = self.canvas.create_rectangle(0, 0, 0, 0, 
                                      fill="red", outline="white", 
                                      tags=(self.tag_root, self.tag_handle))
         
         # Fadenkreuz (Mitte)
-        cx, cy = self.x + self.w/2, self.y + self.h/2
-        self.canvas.create_line(cx, self.y, cx, self.y+self.h, fill=COLOR_ACCENT_RED, dash=(2,2), tags=self.tag_root)
-        self.canvas.create_line(self.x, cy, self.x+self.w, cy, fill=COLOR_ACCENT_RED, dash=(2,2), tags=self.tag_root)
+        self.item_vline = self.canvas.create_line(0, 0, 0, 0, fill=COLOR_ACCENT_RED, dash=(2,2), tags=self.tag_root)
+        self.item_hline = self.canvas.create_line(0, 0, 0, 0, fill=COLOR_ACCENT_RED, dash=(2,2), tags=self.tag_root)
         
         # Label
-        self.canvas.create_text(self.x, self.y-12, text=self.name.replace("_", " ").title(), 
+        self.item_label = self.canvas.create_text(0, 0, text=self.name.replace("_", " ").title(), 
                                 fill=COLOR_TEXT_GOLD, anchor="sw", font=("Arial", 10, "bold"), 
                                 tags=self.tag_root)
+        self.update()
+
+    def update(self):
+        """Setzt die Koordinaten der bestehenden Items (kein Neuzeichnen)."""
+        s = self.scale
+        x1, y1 = self.x * s, self.y * s
+        x2, y2 = (self.x + self.w) * s, (self.y + self.h) * s
+        hs = self.HANDLE_SIZE
+        cx, cy = (x1 + x2) / 2, (y1 + y2) / 2
+        self.canvas.coords(self.item_rect, x1, y1, x2, y2)
+        self.canvas.coords(self.item_handle, x2 - hs, y2 - hs, x2, y2)
+        self.canvas.coords(self.item_vline, cx, y1, cx, y2)
+        self.canvas.coords(self.item_hline, x1, cy, x2, cy)
+        self.canvas.coords(self.item_label, x1, y1 - 12)
+
+    def set_scale(self, scale):
+        self.scale = scale
+        self.update()
 
     def move(self, dx, dy):
+        """dx, dy in Quellpixeln."""
         self.x += dx
         self.y += dy
-        self.canvas.move(self.tag_root, dx, dy)
+        self.canvas.move(self.tag_root, dx * self.scale, dy * self.scale)
 
     def resize(self, new_w, new_h):
         self.w = max(20, new_w)
         self.h = max(20, new_h)
-        self.draw() 
+        self.update()
+
+    def source_box(self):
+        """Ganzzahlige Box (x, y, w, h) im Original-Screenshot."""
+        return int(round(self.x)), int(round(self.y)), int(round(self.w)), int(round(self.h))
 
     def highlight(self, active=True):
         color = "white" if active else COLOR_TEXT_GOLD
         self.canvas.itemconfig(self.tag_rect, outline=color)
 
+class CalibrationView:
+    """Zoombare Kachel-Ansicht des Kalibrier-Screenshots.
+
+    Statt eines einzigen PhotoImage in voller Auflösung werden nur die Kacheln im sichtbaren
+    Bereich (plus eine Kachel Rand) erzeugt: eingepasst sind das wenige verkleinerte Kacheln,
+    bei 100% und mehr Kacheln in Originalauflösung rund um die bearbeitete Stelle.
+    """
+    TILE = 512
+    ZOOM_STEPS = (0.125, 0.25, 0.5, 0.75, 1.0, 1.5, 2.0, 3.0)
+    MAX_TILES = 48
+
+    def __init__(self, canvas):
+        self.canvas = canvas
+        self.img_rgb = None
+        self.scale = 1.0
+        self._tiles = OrderedDict()
+        self._refresh_job = None
+
+    def set_image(self, img_bgr):
+        self.img_rgb = cv2.cvtColor(img_bgr, cv2.COLOR_BGR2RGB)
+        self.clear_tiles()
+        self.scale = self.fit_scale()
+        self._apply_scrollregion()
+        self.canvas.xview_moveto(0); self.canvas.yview_moveto(0)
+        self.refresh()
+
+    def fit_scale(self):
+        h, w = self.img_rgb.shape[:2]
+        cw = max(self.canvas.winfo_width(), 200)
+        ch = max(self.canvas.winfo_height(), 200)
+        return min(1.0, cw / w, ch / h)
+
+    def display_size(self):
+        h, w = self.img_rgb.shape[:2]
+        return max(1, int(round(w * self.scale))), max(1, int(round(h * self.scale)))
+
+    def to_source(self, cx, cy):
+        return cx / self.scale, cy / self.scale
+
+    def _apply_scrollregion(self):
+        dw, dh = self.display_size()
+        self.canvas.config(scrollregion=(0, 0, dw, dh))
+
+    def zoom(self, direction, anchor=None):
+        """Einen Zoomschritt rein (direction > 0) oder raus. anchor: Widget-Koordinaten, die fix bleiben."""
+        if self.img_rgb is None: return False
+        steps = sorted(set(self.ZOOM_STEPS + (round(self.fit_scale(), 4),)))
+        if direction > 0: target = next((z for z in steps if z > self.scale + 1e-6), steps[-1])
+        else: target = next((z for z in reversed(steps) if z < self.scale - 1e-6), steps[0])
+        return self.set_scale(target, anchor)
+
+    def set_scale(self, scale, anchor=None):
+        if self.img_rgb is None or abs(scale - self.scale) < 1e-6: return False
+        if anchor is None: anchor = (self.canvas.winfo_width() / 2, self.canvas.winfo_height() / 2)
+        sx, sy = self.to_source(self.canvas.canvasx(anchor[0]), self.canvas.canvasy(anchor[1]))
+        self.scale = scale
+        self.clear_tiles()
+        self._apply_scrollregion()
+        dw, dh = self.display_size()
+        self.canvas.xview_moveto(max(0.0, sx * scale - anchor[0]) / dw)
+        self.canvas.yview_moveto(max(0.0, sy * scale - anchor[1]) / dh)
+        self.refresh()
+        return True
+
+    def clear_tiles(self):
+        self.canvas.delete("tile")
+        self._tiles.clear()
+
+    def schedule_refresh(self, *_):
+        if self._refresh_job is None:
+            self._refresh_job = self.canvas.after(30, self.refresh)
+
+    def refresh(self):
+        self._refresh_job = None
+        if self.img_rgb is None: return
+        dw, dh = self.display_size()
+        T = self.TILE
+        x0, y0 = self.canvas.canvasx(0), self.canvas.canvasy(0)
+        x1, y1 = x0 + self.canvas.winfo_width(), y0 + self.canvas.winfo_height()
+        ix_range = range(max(0, int(x0 // T) - 1), min((dw - 1) // T, int(x1 // T) + 1) + 1)
+        iy_range = range(max(0, int(y0 // T) - 1), min((dh - 1) // T, int(y1 // T) + 1) + 1)
+        for iy in iy_range:
+            for ix in ix_range:
+                key = (ix, iy)
+                if key in self._tiles: self._tiles.move_to_end(key)
+                else: self._tiles[key] = self._make_tile(ix, iy, dw, dh)
+        while len(self._tiles) > self.MAX_TILES:
+            _, (item, _) = self._tiles.popitem(last=False)
+            self.canvas.delete(item)
+        self.canvas.tag_lower("tile")
+
+    def _make_tile(self, ix, iy, dw, dh):
+        T, s = self.TILE, self.scale
+        h, w = self.img_rgb.shape[:2]
+        dx0, dy0 = ix * T, iy * T
+        dx1, dy1 = min(dx0 + T, dw), min(dy0 + T, dh)
+        sx0, sy0 = int(dx0 / s), int(dy0 / s)
+        sx1, sy1 = min(w, max(sx0 + 1, int(math.ceil(dx1 / s)))), min(h, max(sy0 + 1, int(math.ceil(dy1 / s))))
+        part = self.img_rgb[sy0:sy1, sx0:sx1]
+        if part.shape[1] != dx1 - dx0 or part.shape[0] != dy1 - dy0:
+            # Verkleinern glätten, Vergrößern pixelgenau (zum exakten Ausrichten der Rahmen)
+            interp = cv2.INTER_AREA if s < 1.0 else cv2.INTER_NEAREST
+            part = cv2.resize(part, (dx1 - dx0, dy1 - dy0), interpolation=interp)
+        photo = ImageTk.PhotoImage(Image.fromarray(part))
+        item = self.canvas.create_image(dx0, dy0, image=photo, anchor="nw", tags="tile")
+        return item, photo
+
+class BackgroundRenderer:
+    """Rendert das abgedunkelte Hintergrundbild passend zur Fenstergröße.
+
+    Das Abdunkeln passiert einmalig beim Laden. Fertige Größen landen in einem kleinen
+    LRU-Cache, beim Live-Ziehen wird mit einem schnellen Filter gerendert.
+    """
+    def __init__(self, image, photo_factory=ImageTk.PhotoImage, cache_size=4, max_size=(3840, 2160)):
+        image = image.convert("RGB")
+        image.thumbnail(max_size, Image.Resampling.LANCZOS)
+        self.base = ImageEnhance.Brightness(image).enhance(0.4)
+        self.photo_factory = photo_factory
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self.render_count = 0
+        self.render_seconds = 0.0
+
+    def cached(self, size):
+        photo = self._cache.get(size)
+        if photo is not None: self._cache.move_to_end(size)
+        return photo
+
+    def render(self, size, fast=False):
+        """fast=True: BILINEAR, nicht gecacht (Zwischenbild beim Ziehen)."""
+        if not fast:
+            photo = self.cached(size)
+            if photo is not None: return photo
+        start = time.perf_counter()
+        resample = Image.Resampling.BILINEAR if fast else Image.Resampling.LANCZOS
+        photo = self.photo_factory(self.base.resize(size, resample))
+        self.render_count += 1
+        self.render_seconds += time.perf_counter() - start
+        if not fast:
+            self._cache[size] = photo
+            while len(self._cache) > self.cache_size: self._cache.popitem(last=False)
+        return photo
+
 class LotroApp:
     def __init__(self, root):
         self.root = root
@@ -100,9 +285,13 @@ class LotroApp:
                 self.root.iconphoto(True, icon_img)
             except: pass
 
-        self.engine = CoreEngine()
-        self.running = False
+        with startup_profile.measure("init", "CoreEngine"): self.engine = CoreEngine()
         self.hotkey_hook = None
+        self.local_voices = []
+        self.local_voices_loading = False
+        self.own_snapshot = None    # zuletzt von dieser GUI gespeicherter Stand (nicht zurück in die Widgets laden)
+        self.daemon = None          # DaemonClient, wenn ein Daemon läuft (GUI ist dann nur Client)
+        self.daemon_hotkey = False
         
         self.bg_photo = None
         self.setup_background()
@@ -121,6 +310,14 @@ class LotroApp:
 
         self.load_settings_to_ui()
         self.register_hotkey()
+        # Externe Änderungen an config.json kommen aus dem Watcher-Thread -> in den Tk-Thread holen
+        self.engine.config_store.subscribe(lambda snap, changed: self.root.after(0, self.on_config_changed, snap, changed))
+        self.engine.subscribe_backend_status(lambda name, state: self.root.after(0, self.update_backend_status))
+        self.engine.scheduler.subscribe(on_result=lambda txt, src: self.root.after(0, self.on_scan_result, txt, src),
+                                        on_state=lambda state: self.root.after(0, self.on_scan_state, state))
+        self.update_model_status()
+        # Sobald der Mainloop läuft, ist das Fenster da - erst dann die Backends hochfahren
+        self.root.after(0, self.on_window_ready)
 
         # Variablen
         self.calib_img_raw = None
@@ -131,24 +328,51 @@ class LotroApp:
         self.debug_photo_1 = None
         self.debug_photo_2 = None
 
+    BG_DEBOUNCE_MS = 150
+    BG_FAST_INTERVAL = 0.05
+    MODEL_STATUS_MS = 5000
+
     def setup_background(self):
         bg_path = "background.png"
+        self.bg_renderer = None
         if os.path.exists(bg_path):
             try:
-                image = Image.open(bg_path)
-                image = image.point(lambda p: p * 0.4) 
-                self.bg_image_raw = image 
+                self.bg_renderer = BackgroundRenderer(Image.open(bg_path))
+                self.bg_size = None
+                self.bg_job = None
+                self.bg_last_fast = 0.0
                 self.bg_label = tk.Label(self.root, bg=COLOR_BG_DARK)
                 self.bg_label.place(x=0, y=0, relwidth=1, relheight=1)
                 self.root.bind("<Configure>", self.resize_background)
             except: pass
 
     def resize_background(self, event):
-        if hasattr(self, 'bg_image_raw'):
-            if event.width > 0 and event.height > 0:
-                resized = self.bg_image_raw.resize((event.width, event.height), Image.Resampling.LANCZOS)
-                self.bg_photo = ImageTk.PhotoImage(resized)
-                self.bg_label.config(image=self.bg_photo)
+        # <Configure> feuert auch für jedes Kind-Widget -> nur echte Größenänderungen des Fensters
+        if event.widget is not self.root or self.bg_renderer is None: return
+        size = (event.width, event.height)
+        if size == self.bg_size or size[0] <= 1 or size[1] <= 1: return
+        self.bg_size = size
+        if self.bg_job is not None:
+            self.root.after_cancel(self.bg_job)
+            self.bg_job = None
+
+        photo = self.bg_renderer.cached(size)
+        if photo is None:
+            # Während des Ziehens höchstens alle 50ms ein schnelles Zwischenbild
+            now = time.perf_counter()
+            if now - self.bg_last_fast >= self.BG_FAST_INTERVAL:
+                self.bg_last_fast = now
+                photo = self.bg_renderer.render(size, fast=True)
+            self.bg_job = self.root.after(self.BG_DEBOUNCE_MS, self._render_background_final)
+        if photo is not None: self._show_background(photo)
+
+    def _render_background_final(self):
+        self.bg_job = None
+        if self.bg_size: self._show_background(self.bg_renderer.render(self.bg_size))
+
+    def _show_background(self, photo):
+        self.bg_photo = photo
+        self.bg_label.config(image=photo)
 
     def setup_styles(self):
         style = ttk.Style()
@@ -184,6 +408,12 @@ class LotroApp:
         
         self.create_lotro_button(top_frame, "Macht entfesseln (Scan)", self.run_once_manual).pack(side="right")
 
+        # Start der Backends (EasyOCR, Gemini, Audio, ...) und Speicher der geladenen Modelle
+        self.lbl_backends = ttk.Label(self.tab_status, text="Backends werden vorbereitet...", foreground=COLOR_TEXT_DIM)
+        self.lbl_backends.pack(anchor="w", padx=20)
+        self.lbl_models = ttk.Label(self.tab_status, text="", foreground=COLOR_TEXT_DIM)
+        self.lbl_models.pack(anchor="w", padx=20)
+
         text_frame = ttk.Frame(self.tab_status)
         text_frame.pack(fill="both", expand=True, padx=20, pady=5)
         
@@ -208,22 +438,95 @@ class LotroApp:
         self.lbl_debug_2 = tk.Label(f2, bg="black", text="Kein Bild", fg="gray", height=12)
         self.lbl_debug_2.pack(fill="both", expand=True)
 
+    def on_window_ready(self):
+        startup_profile.mark("Fenster sichtbar")
+        threading.Thread(target=self._look_for_daemon, name="DaemonLookup", daemon=True).start()
+
+    def _look_for_daemon(self):
+        # Läuft schon ein Daemon (main.py --daemon), hält er die Modelle - dann hier nichts laden
+        found = find_daemon()
+        if found: self.root.after(0, self.attach_daemon, *found)
+        else: self.engine.start_backends()
+
+    # --- DAEMON-CLIENT ---
+    def attach_daemon(self, client, status):
+        """Scans, Backends und Modelle laufen im Daemon; die GUI zeigt nur an und leitet weiter."""
+        self.daemon = client
+        self.daemon_hotkey = bool(status.get("hotkey"))
+        log_message(f"Daemon gefunden ({client.base}, PID {status.get('pid')}) - GUI läuft als Client.")
+        if self.daemon_hotkey: self.register_hotkey()  # der Daemon hat den Hotkey schon
+        threading.Thread(target=self._follow_daemon, args=(client,), name="DaemonEvents", daemon=True).start()
+
+    def detach_daemon(self):
+        if self.daemon is None: return
+        log_message("Daemon nicht mehr erreichbar - GUI übernimmt selbst.", level="WARNING")
+        self.daemon = None
+        self.daemon_hotkey = False
+        self.register_hotkey()
+        self.engine.start_backends()
+
+    def _follow_daemon(self, client):
+        version, scans = -1, None
+        while self.daemon is client:
+            try: event = client.events(version)
+            except Exception:
+                self.root.after(0, self.detach_daemon); return
+            if event["version"] == version: continue
+            version = event["version"]
+            self.root.after(0, self.on_daemon_event, event, scans is not None and event["scans"] != scans)
+            scans = event["scans"]
+
+    def on_daemon_event(self, event, new_scan):
+        self.on_scan_state(event["state"])
+        self.update_backend_status(event["backends"])
+        if new_scan and event["last_scan"]:
+            self.update_ui_text(f"--- {event['last_scan']['source']} ---\n{event['last_scan']['text']}")
+            if self.engine.config.debug_mode: self.load_debug_images()
+
+    def _daemon_call(self, action):
+        try: action()
+        except Exception as e: log_message(f"Daemon-Anfrage fehlgeschlagen: {e}", level="WARNING")
+
+    def update_backend_status(self, status=None):
+        status = status or self.engine.backend_status
+        if not status: return
+        self.lbl_backends.config(text="Backends: " + "  |  ".join(f"{name}: {state}" for name, state in status.items()))
+
+    def update_model_status(self):
+        if self.daemon is not None:
+            threading.Thread(target=self._fetch_daemon_models, args=(self.daemon,), daemon=True).start()
+        else:
+            try: self.lbl_models.config(text=self.engine.models.report())
+            except Exception as e: log_message(f"Modell-Status Fehler: {e}", level="DEBUG")
+        self.root.after(self.MODEL_STATUS_MS, self.update_model_status)
+
+    def _fetch_daemon_models(self, client):
+        try: report = next((r for r in client.metrics()["reports"] if r.startswith("Modelle")), "")
+        except Exception as e:
+            log_message(f"Modell-Status Fehler: {e}", level="DEBUG"); return
+        self.root.after(0, lambda: self.lbl_models.config(text=f"Daemon  |  {report}"))
+
     def load_debug_images(self):
-        def load(path, label):
-            if os.path.exists(path):
-                try:
-                    img = Image.open(path)
-                    target_h = 200
-                    aspect = img.width / img.height
-                    target_w = int(target_h * aspect)
-                    img = img.resize((target_w, target_h), Image.Resampling.LANCZOS)
-                    photo = ImageTk.PhotoImage(img)
-                    label.config(image=photo, text="", width=0, height=0)
-                    return photo
-                except: pass
-            return None
-        self.debug_photo_1 = load("debug_detection_view.png", self.lbl_debug_1)
-        self.debug_photo_2 = load("debug_ocr_input.png", self.lbl_debug_2)
+        """Holt die neuesten Vorschau-Frames aus dem Speicher (bereits verkleinert, RGB) - als Client vom Daemon."""
+        if self.daemon is not None:
+            threading.Thread(target=self._fetch_daemon_previews, args=(self.daemon,), daemon=True).start(); return
+        self.show_debug_frames({slot: Image.fromarray(frame) for slot, frame in self.engine.ocr_extractor.previews.drain().items()})
+
+    def _fetch_daemon_previews(self, client):
+        try: frames = {slot: Image.open(io.BytesIO(data)) for slot, data in client.previews().items()}
+        except Exception as e:
+            log_message(f"Vorschau vom Daemon nicht geladen: {e}", level="DEBUG"); return
+        self.root.after(0, self.show_debug_frames, frames)
+
+    def show_debug_frames(self, frames):
+        def show(image, label):
+            try:
+                photo = ImageTk.PhotoImage(image)
+                label.config(image=photo, text="", width=0, height=0)
+                return photo
+            except: return None
+        if "detection" in frames: self.debug_photo_1 = show(frames["detection"], self.lbl_debug_1)
+        if "ocr_input" in frames: self.debug_photo_2 = show(frames["ocr_input"], self.lbl_debug_2)
 
     # --- TAB 2: KALIBRIERUNG ---
     def setup_calibration_tab(self):
@@ -236,8 +539,9 @@ class LotroApp:
         paned.add(frame_controls, weight=1)
 
         self.calib_canvas = tk.Canvas(frame_canvas, bg="black", cursor="cross")
-        v_scroll = ttk.Scrollbar(frame_canvas, orient="vertical", command=self.calib_canvas.yview)
-        h_scroll = ttk.Scrollbar(frame_canvas, orient="horizontal", command=self.calib_canvas.xview)
+        self.calib_view = CalibrationView(self.calib_canvas)
+        v_scroll = ttk.Scrollbar(frame_canvas, orient="vertical", command=self.on_calib_yview)
+        h_scroll = ttk.Scrollbar(frame_canvas, orient="horizontal", command=self.on_calib_xview)
         self.calib_canvas.configure(yscrollcommand=v_scroll.set, xscrollcommand=h_scroll.set)
         v_scroll.pack(side="right", fill="y")
         h_scroll.pack(side="bottom", fill="x")
@@ -246,9 +550,12 @@ class LotroApp:
         self.calib_canvas.bind("<ButtonPress-1>", self.on_mouse_down)
         self.calib_canvas.bind("<B1-Motion>", self.on_mouse_drag)
         self.calib_canvas.bind("<ButtonRelease-1>", self.on_mouse_up)
+        self.calib_canvas.bind("<MouseWheel>", self.on_calib_zoom)
+        self.calib_canvas.bind("<Configure>", self.calib_view.schedule_refresh)
 
         ttk.Label(frame_controls, text="1. Bild Erfassen", style="Header.TLabel").pack(anchor="w")
         self.create_lotro_button(frame_controls, "Screenshot (3s)", self.take_calibration_screenshot, color=COLOR_TEXT_GOLD).pack(fill="x", pady=5)
+        ttk.Label(frame_controls, text="Mausrad: Zoom (für pixelgenaues Setzen)", foreground=COLOR_TEXT_DIM).pack(anchor="w")
         
         ttk.Label(frame_controls, text="2. Templates setzen", style="Header.TLabel").pack(anchor="w", pady=(20,5))
         self.create_lotro_button(frame_controls, "Rahmen Reset", self.spawn_default_rects, color=COLOR_ACCENT_RED).pack(fill="x", pady=5)
@@ -271,6 +578,18 @@ class LotroApp:
         self.create_lotro_button(frame_controls, "Speichern & Testen", self.save_and_test_ocr, color=COLOR_TEXT_GOLD).pack(fill="x", pady=30)
 
     # --- MAUS LOGIK ---
+    def on_calib_xview(self, *args):
+        self.calib_canvas.xview(*args)
+        self.calib_view.schedule_refresh()
+
+    def on_calib_yview(self, *args):
+        self.calib_canvas.yview(*args)
+        self.calib_view.schedule_refresh()
+
+    def on_calib_zoom(self, event):
+        if self.calib_view.zoom(1 if event.delta > 0 else -1, anchor=(event.x, event.y)):
+            for rect in self.template_rects.values(): rect.set_scale(self.calib_view.scale)
+
     def on_mouse_down(self, event):
         if not self.calib_img_raw is None:
             cx = self.calib_canvas.canvasx(event.x)
@@ -301,8 +620,9 @@ class LotroApp:
         if self.active_rect and self.action_mode:
             cx = self.calib_canvas.canvasx(event.x)
             cy = self.calib_canvas.canvasy(event.y)
-            dx = cx - self.last_mouse[0]
-            dy = cy - self.last_mouse[1]
+            # Canvas-Delta -> Quellpixel
+            dx = (cx - self.last_mouse[0]) / self.calib_view.scale
+            dy = (cy - self.last_mouse[1]) / self.calib_view.scale
             
             if self.action_mode == 'move':
                 self.active_rect.move(dx, dy)
@@ -331,32 +651,27 @@ class LotroApp:
             img = np.array(sct_img)
             self.calib_img_raw = cv2.cvtColor(img, cv2.COLOR_BGRA2BGR)
             
-            img_rgb = cv2.cvtColor(self.calib_img_raw, cv2.COLOR_BGR2RGB)
-            im_pil = Image.fromarray(img_rgb)
-            self.calib_photo = ImageTk.PhotoImage(im_pil)
-
-            self.calib_canvas.config(scrollregion=(0,0, im_pil.width, im_pil.height))
-            self.calib_canvas.delete("all")
-            self.calib_canvas.create_image(0, 0, image=self.calib_photo, anchor="nw")
-            
         self.root.deiconify()
+        self.root.update_idletasks()
+        self.calib_canvas.delete("all")
+        self.calib_view.set_image(self.calib_img_raw)
         self.spawn_default_rects()
         messagebox.showinfo("Bereit", "Verschiebe nun die goldenen Rahmen.")
 
     def spawn_default_rects(self):
         if self.calib_img_raw is None: return
+        for rect in self.template_rects.values(): self.calib_canvas.delete(rect.tag_root)
         self.template_rects = {} 
-        self.calib_canvas.delete("all")
-        self.calib_canvas.create_image(0, 0, image=self.calib_photo, anchor="nw")
+        scale = self.calib_view.scale
 
         h, w = self.calib_img_raw.shape[:2]
         size = 40
         mid_x, mid_y = w // 2, h // 2
         
-        self.template_rects["top_left"] = DraggableRect(self.calib_canvas, mid_x - 200, mid_y - 150, size, "top_left", "Oben Links")
-        self.template_rects["top_right"] = DraggableRect(self.calib_canvas, mid_x + 200, mid_y - 150, size, "top_right", "Oben Rechts")
-        self.template_rects["bottom_left"] = DraggableRect(self.calib_canvas, mid_x - 200, mid_y + 150, size, "bottom_left", "Unten Links")
-        self.template_rects["bottom_right"] = DraggableRect(self.calib_canvas, mid_x + 200, mid_y + 150, size, "bottom_right", "Unten Rechts")
+        self.template_rects["top_left"] = DraggableRect(self.calib_canvas, mid_x - 200, mid_y - 150, size, "top_left", "Oben Links", scale)
+        self.template_rects["top_right"] = DraggableRect(self.calib_canvas, mid_x + 200, mid_y - 150, size, "top_right", "Oben Rechts", scale)
+        self.template_rects["bottom_left"] = DraggableRect(self.calib_canvas, mid_x - 200, mid_y + 150, size, "bottom_left", "Unten Links", scale)
+        self.template_rects["bottom_right"] = DraggableRect(self.calib_canvas, mid_x + 200, mid_y + 150, size, "bottom_right", "Unten Rechts", scale)
 
     def save_templates_from_rects(self):
         if not self.calib_img_raw is None and len(self.template_rects) == 4:
@@ -367,7 +682,7 @@ class LotroApp:
                 img_gray = cv2.cvtColor(self.calib_img_raw, cv2.COLOR_BGR2GRAY)
                 
                 for name, rect in self.template_rects.items():
-                    x, y, w, h = int(rect.x), int(rect.y), int(rect.w), int(rect.h)
+                    x, y, w, h = rect.source_box()
                     x = max(0, x); y = max(0, y)
                     w = min(w, img_gray.shape[1] - x)
                     h = min(h, img_gray.shape[0] - y)
@@ -375,31 +690,47 @@ class LotroApp:
                     crop = img_gray[y:y+h, x:x+w]
                     cv2.imwrite(os.path.join(template_dir, f"{name}.png"), crop)
                 
-                self.engine.ocr_extractor.templates = self.engine.ocr_extractor._load_templates()
+                self.engine.ocr_extractor.reload_templates()
+                # Als Client scannt der Daemon - der muss die neuen Templates auch lesen
+                if self.daemon is not None:
+                    threading.Thread(target=self._daemon_call, args=(self.daemon.reload_templates,), daemon=True).start()
                 messagebox.showinfo("Erfolg", "Templates gespeichert!")
             except Exception as e:
                 messagebox.showerror("Fehler", str(e))
 
     def save_and_test_ocr(self):
-        cfg = self.engine.config
         try:
-            cfg["padding_top"] = int(self.spin_top.get())
-            cfg["padding_bottom"] = int(self.spin_bottom.get())
-            cfg["padding_left"] = int(self.spin_left.get())
-            cfg["padding_right"] = int(self.spin_right.get())
-            
-            save_config(cfg)
-            self.engine.ocr_extractor.config = cfg
-            
-            # --- UPDATE: Tuple return ---
-            txt, src = self.engine.run_pipeline(skip_audio=True)
-            self.update_ui_text(f"--- TEST ({src}) ---\n{txt}")
-            
-            self.load_debug_images()
-            self.notebook.select(self.tab_status)
-            
+            self.update_config({
+                "padding_top": int(self.spin_top.get()),
+                "padding_bottom": int(self.spin_bottom.get()),
+                "padding_left": int(self.spin_left.get()),
+                "padding_right": int(self.spin_right.get()),
+            })
         except Exception as e:
-            messagebox.showerror("Fehler", str(e))
+            messagebox.showerror("Fehler", str(e)); return
+        # Test-Scan ohne Audio über den Scheduler (bzw. den Daemon) - der Tk-Thread wartet nicht auf die OCR
+        self.notebook.select(self.tab_status)
+        threading.Thread(target=self._run_ocr_test, args=(self.daemon,), name="OCRTest", daemon=True).start()
+
+    def _run_ocr_test(self, client):
+        try:
+            if client is not None:
+                result = client.scan(wait=True, timeout=60, skip_audio=True)
+                txt, src = result["text"], result["source"]
+            else:
+                state, result = self.engine.scheduler.wait(self.engine.request_scan("OCR-Test", skip_audio=True), 60)
+                if state == "timeout": raise RuntimeError("Test-Scan nicht rechtzeitig fertig")
+                # Ein Hotkey-Scan kam dazwischen - dessen Ergebnis ist kein Testergebnis
+                if state == "superseded": raise RuntimeError("Test-Scan durch einen neueren Scan abgelöst - bitte erneut testen")
+                if result is None: raise RuntimeError("Test-Scan fehlgeschlagen")
+                txt, src = result
+        except Exception as e:
+            self.root.after(0, messagebox.showerror, "Fehler", str(e)); return
+        self.root.after(0, self._show_ocr_test, txt, src)
+
+    def _show_ocr_test(self, txt, src):
+        self.update_ui_text(f"--- TEST ({src}) ---\n{txt}")
+        self.load_debug_images()
 
     # --- TAB 3: EINSTELLUNGEN ---
     def setup_settings_tab(self):
@@ -426,6 +757,9 @@ class LotroApp:
         ttk.Label(f_xtts_in, text="Stimme (.wav):").pack(side="left")
         self.cmb_xtts_voice = ttk.Combobox(f_xtts_in, state="readonly", width=30); self.cmb_xtts_voice.pack(side="left", padx=5)
         tk.Button(f_xtts_in, text="Scan", command=self.refresh_xtts_voices, bg=COLOR_BG_PANEL, fg=COLOR_TEXT_DIM, relief="flat", font=("Arial", 8)).pack(side="left")
+        self.var_xtts_cpu = tk.BooleanVar()
+        tk.Checkbutton(f_xtts_in, text="CPU-optimiert (int8, schneller)", variable=self.var_xtts_cpu, 
+                       bg=COLOR_BG_PANEL, fg=COLOR_TEXT_GOLD, selectcolor=COLOR_INPUT_BG, activebackground=COLOR_BG_PANEL, activeforeground=COLOR_TEXT_GOLD).pack(side="left", padx=15)
 
         # 3. Local System
         f_sys = ttk.Frame(sf); f_sys.pack(fill="x", pady=5)
@@ -445,6 +779,12 @@ class LotroApp:
         self.var_use_ai = tk.BooleanVar()
         tk.Checkbutton(frm_ai, text="Nutze Google Gemini AI statt EasyOCR", variable=self.var_use_ai, 
                        bg=COLOR_BG_PANEL, fg=COLOR_TEXT_GOLD, selectcolor=COLOR_INPUT_BG, activebackground=COLOR_BG_PANEL, activeforeground=COLOR_TEXT_GOLD).pack(side="left")
+        self.var_hedged = tk.BooleanVar()
+        tk.Checkbutton(frm_ai, text="Hedged: parallel zu EasyOCR", variable=self.var_hedged, 
+                       bg=COLOR_BG_PANEL, fg=COLOR_TEXT_GOLD, selectcolor=COLOR_INPUT_BG, activebackground=COLOR_BG_PANEL, activeforeground=COLOR_TEXT_GOLD).pack(side="left", padx=15)
+        self.var_hybrid = tk.BooleanVar()
+        tk.Checkbutton(frm_ai, text="Hybrid: nur unsichere Zeilen an Gemini", variable=self.var_hybrid, 
+                       bg=COLOR_BG_PANEL, fg=COLOR_TEXT_GOLD, selectcolor=COLOR_INPUT_BG, activebackground=COLOR_BG_PANEL, activeforeground=COLOR_TEXT_GOLD).pack(side="left", padx=15)
         
         frm_mdl = ttk.Frame(sf); frm_mdl.pack(fill="x", pady=2)
         ttk.Label(frm_mdl, text="Modell:").pack(side="left")
@@ -487,7 +827,122 @@ class LotroApp:
             self.cmb_xtts_voice.set(curr if curr in files else files[0])
         else: self.cmb_xtts_voice['values'] = ["(Leer)"]; self.cmb_xtts_voice.current(0)
 
-    def load_settings_to_ui(self):
+    def load_settings_to_ui(self, keys=None):
+        """Überträgt Config-Werte in die Widgets - nur die für keys (None = alle), Rest bleibt wie bearbeitet."""
         c = self.engine.config
+        def want(key): return keys is None or key in keys
         # API Keys
-        self.ent_api
+        if want("api_key"): self.ent_api_key.delete(0, tk.END); self.ent_api_key.insert(0, c.get("api_key", ""))
+        if want("gemini_api_key"): self.ent_gemini_key.delete(0, tk.END); self.ent_gemini_key.insert(0, c.get("gemini_api_key", ""))
+        if want("use_ai_ocr"): self.var_use_ai.set(c.get("use_ai_ocr", False))
+        if want("hybrid_ocr"): self.var_hybrid.set(c.get("hybrid_ocr", False))
+        if want("ocr_hedged"): self.var_hedged.set(c.get("ocr_hedged", False))
+        if want("gemini_model_name"): self.cmb_gemini_model.set(c.get("gemini_model_name", "models/gemini-1.5-flash"))
+
+        # Stimme
+        if want("tts_provider"): self.var_tts_provider.set(c.get("tts_provider", "elevenlabs"))
+        if want("xtts_cpu_optimized"): self.var_xtts_cpu.set(c.get("xtts_cpu_optimized", False))
+        if want("xtts_reference_wav"): self.refresh_xtts_voices()
+        if want("local_voice_id"):
+            if self.engine.tts_service.local_voices_loaded(): self.show_local_voices(self.engine.tts_service.get_local_voices())
+            elif not self.local_voices_loading:
+                # pyttsx3 erst im Hintergrund initialisieren, die Liste kommt nach
+                self.local_voices_loading = True
+                tts = self.engine.tts_service
+                threading.Thread(target=lambda: self.root.after(0, self.show_local_voices, tts.get_local_voices()), daemon=True).start()
+
+        # Sonstiges
+        if want("monitor_index"): self.cmb_monitor.set(str(c.get("monitor_index", 1)))
+        if want("hotkey"): self.ent_hotkey.delete(0, tk.END); self.ent_hotkey.insert(0, c.get("hotkey", "ctrl+alt+s"))
+        if want("debug_mode"): self.var_debug.set(c.get("debug_mode", False))
+
+        # Padding
+        for spin, key in ((self.spin_top, "padding_top"), (self.spin_bottom, "padding_bottom"),
+                          (self.spin_left, "padding_left"), (self.spin_right, "padding_right")):
+            if want(key): spin.delete(0, tk.END); spin.insert(0, str(c.get(key, 0)))
+
+    def update_config(self, changes):
+        """Speichert Änderungen aus dieser GUI; der Rückweg über on_config_changed lässt die Widgets dann in Ruhe."""
+        self.own_snapshot = self.engine.update_config(changes)
+        return self.own_snapshot
+
+    def show_local_voices(self, voices):
+        self.local_voices_loading = False
+        self.local_voices = voices
+        self.cmb_local_voice['values'] = [name for _, name in voices]
+        for vid, name in voices:
+            if vid == self.engine.config.get("local_voice_id", ""): self.cmb_local_voice.set(name)
+
+    def save_settings(self):
+        local_name = self.cmb_local_voice.get()
+        # Solange die Systemstimmen noch laden, die gespeicherte Stimme behalten
+        local_id = next((vid for vid, name in self.local_voices if name == local_name), self.engine.config.get("local_voice_id", ""))
+        xtts_voice = self.cmb_xtts_voice.get()
+        try: monitor = int(self.cmb_monitor.get())
+        except: monitor = 1
+        self.update_config({
+            "api_key": self.ent_api_key.get().strip(),
+            "gemini_api_key": self.ent_gemini_key.get().strip(),
+            "use_ai_ocr": self.var_use_ai.get(),
+            "hybrid_ocr": self.var_hybrid.get(),
+            "ocr_hedged": self.var_hedged.get(),
+            "gemini_model_name": self.cmb_gemini_model.get(),
+            "tts_provider": self.var_tts_provider.get(),
+            "local_voice_id": local_id,
+            "xtts_reference_wav": xtts_voice if xtts_voice != "(Leer)" else "",
+            "xtts_cpu_optimized": self.var_xtts_cpu.get(),
+            "monitor_index": monitor,
+            "hotkey": self.ent_hotkey.get().strip() or "ctrl+alt+s",
+            "debug_mode": self.var_debug.get(),
+        })
+        messagebox.showinfo("Gespeichert", "Die Einstellungen wurden in Stein gemeißelt.")
+
+    def on_config_changed(self, snapshot, changed):
+        """Läuft im Tk-Thread, sobald sich der Config-Snapshot geändert hat."""
+        if "hotkey" in changed: self.register_hotkey()
+        # Eigene Speicherungen stehen schon in den Widgets; bei externen nur die betroffenen anfassen
+        if snapshot is not self.own_snapshot: self.load_settings_to_ui(changed)
+
+    def register_hotkey(self):
+        if self.hotkey_hook is not None:
+            try: keyboard.remove_hotkey(self.hotkey_hook)
+            except: pass
+            self.hotkey_hook = None
+        if self.daemon_hotkey: return
+        hotkey = self.engine.config.get("hotkey", "ctrl+alt+s")
+        try:
+            self.hotkey_hook = keyboard.add_hotkey(hotkey, self.run_once_manual)
+            log_message(f"Hotkey aktiv: {hotkey}")
+        except Exception as e:
+            log_message(f"Hotkey Fehler ({hotkey}): {e}", level="ERROR")
+
+    # --- SCAN ---
+    def run_once_manual(self):
+        # Hotkey und Button gehen durch den Scheduler: mehrfaches Drücken startet keine parallelen Scans
+        if self.daemon is not None:
+            threading.Thread(target=self._daemon_call, args=(self.daemon.scan,), daemon=True).start()
+        else: self.engine.scheduler.trigger("Hotkey/Button")
+
+    def on_scan_state(self, state):
+        self.lbl_status.config(text="Die Runen werden gelesen..." if state == "running" else "Warte auf Zeichen...")
+
+    def on_scan_result(self, txt, src):
+        self.update_ui_text(f"--- {src} ---\n{txt}")
+        if self.engine.config.debug_mode: self.load_debug_images()
+
+    def update_ui_text(self, text):
+        self.txt_preview.config(state="normal")
+        self.txt_preview.delete("1.0", tk.END)
+        self.txt_preview.insert("1.0", text)
+        self.txt_preview.config(state="disabled")
+
+if __name__ == "__main__":
+    # Nötig für den OCR-Worker-Prozess in der PyInstaller-EXE
+    multiprocessing.freeze_support()
+    # --daemon: ohne Fenster, nur die lokale API (optional --no-hotkey)
+    if "--daemon" in sys.argv:
+        run_daemon(hotkey="--no-hotkey" not in sys.argv)
+        sys.exit(0)
+    root = tk.Tk()
+    app = LotroApp(root)
+    root.mainloop()
@@ -0,0 +1,233 @@
+import gc
+import sys
+import time
+import threading
+from contextlib import contextmanager
+from utils import log_message, process_memory_mb
+
+# EasyOCR und XTTS belegen zusammen mehrere GB neben dem laufenden Spiel. Der Manager entlädt
+# sie nach Inaktivität oder wenn das Speicherbudget überschritten ist und lädt sie bei neuer
+# Aktivität (Hotkey, neue Log-Zeile) im Hintergrund wieder.
+MODEL_SWEEP_INTERVAL = 15
+
+def release_torch_memory():
+    """Gibt freigewordenen Speicher zurück, ohne torch dafür extra zu importieren."""
+    gc.collect()
+    torch = sys.modules.get("torch")
+    if torch is None: return
+    try:
+        if torch.cuda.is_available(): torch.cuda.empty_cache()
+    except: pass
+
+def _cuda_allocated_mb():
+    torch = sys.modules.get("torch")
+    try:
+        if torch is not None and torch.cuda.is_available(): return torch.cuda.memory_allocated() / 1048576
+    except: pass
+    return 0.0
+
+class ManagedModel:
+    """Ein verwaltetes Modell: Lade-/Entlade-Funktion plus Nutzungs- und Speicherstatistik."""
+    def __init__(self, name, load, unload, memory=None):
+        self.name = name
+        self._load = load
+        self._unload = unload
+        self._memory = memory     # optional: liefert den echten Verbrauch (z.B. aus dem OCR-Worker)
+        self.lock = threading.RLock()
+        self.loaded = False
+        self.wanted = False       # zuletzt benutzt -> bei neuer Aktivität wieder vorladen
+        self.preloading = False
+        self.loading = 0          # Threads in ensure_loaded
+        self.pending = None       # vorgemerktes Entladen (grund, keep_wanted, reload), solange es lädt oder arbeitet
+        self.busy = 0
+        self.last_used = 0.0
+        self.mem_mb = 0.0         # RSS/VRAM-Zuwachs beim letzten Laden (Näherung)
+        self.peak_mb = 0.0
+        self.loads = 0
+        self.unloads = 0
+
+    def memory_mb(self):
+        if not self.loaded: return 0.0
+        if self._memory is not None:
+            try:
+                value = self._memory()
+                if value: return value
+            except: pass
+        return self.mem_mb
+
+class ModelManager:
+    """Lebenszyklus der schweren Modelle: Laden bei Bedarf, Entladen nach Leerlauf oder über Budget."""
+    def __init__(self, budget_mb=0, idle_timeout=600):
+        self.budget_mb = budget_mb       # 0 = unbegrenzt
+        self.idle_timeout = idle_timeout # Sekunden, 0 = nie entladen
+        self.models = {}
+        self.peak_mb = 0.0
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()  # Laden nacheinander: saubere Messung, keine doppelte Lastspitze
+        self._thread = None
+        self._stop = threading.Event()
+
+    def configure(self, snapshot, changed=None):
+        """ConfigStore-Callback für model_memory_budget_mb und model_idle_timeout."""
+        try: self.budget_mb = float(snapshot.get("model_memory_budget_mb", 0) or 0)
+        except: self.budget_mb = 0
+        try: self.idle_timeout = float(snapshot.get("model_idle_timeout", 600) or 0)
+        except: self.idle_timeout = 600
+
+    def register(self, name, load, unload, memory=None):
+        self.models[name] = ManagedModel(name, load, unload, memory)
+
+    def is_loaded(self, name):
+        return name in self.models and self.models[name].loaded
+
+    # --- Laden ---
+    def ensure_loaded(self, name):
+        """Lädt das Modell falls nötig (blockierend). False, wenn das Laden fehlschlägt."""
+        m = self.models[name]
+        m.wanted = True
+        m.last_used = time.monotonic()
+        # loading vor m.lock setzen: ein unload() in der Zwischenzeit wird vorgemerkt statt zu warten
+        with self._lock: m.loading += 1
+        try:
+            ok = self._load_locked(m)
+        finally:
+            with self._lock: m.loading -= 1
+        # Während des Ladens vorgemerktes Entladen (z.B. Moduswechsel) jetzt nachholen
+        self._run_pending(m)
+        if not ok: return False
+        self._update_peak()
+        self._make_room(keep=m)
+        return True
+
+    def _load_locked(self, m):
+        # Immer unter m.lock prüfen: ein laufendes Entladen muss erst fertig sein
+        with m.lock:
+            if m.loaded: return True
+            self._make_room(keep=m, extra_mb=m.mem_mb)
+            with self._load_lock:
+                rss_before, cuda_before = process_memory_mb()[0], _cuda_allocated_mb()
+                start = time.perf_counter()
+                try:
+                    if m._load() is False: return False
+                except Exception as e:
+                    log_message(f"Modell {m.name} konnte nicht geladen werden: {e}", level="ERROR")
+                    return False
+                m.mem_mb = max(0.0, process_memory_mb()[0] - rss_before) + max(0.0, _cuda_allocated_mb() - cuda_before)
+            m.loaded = True
+            m.loads += 1
+            m.last_used = time.monotonic()
+            m.peak_mb = max(m.peak_mb, m.memory_mb())
+            log_message(f"Modell geladen: {m.name}", mem_mb=f"{m.mem_mb:.0f}", load_s=f"{time.perf_counter() - start:.1f}")
+            return True
+
+    def preload(self, name):
+        """Lädt das Modell in einem Hintergrund-Thread."""
+        m = self.models[name]
+        m.wanted = True
+        if m.loaded or m.preloading: return
+        m.preloading = True
+        def run():
+            try: self.ensure_loaded(name)
+            finally: m.preloading = False
+        threading.Thread(target=run, name=f"Preload-{name}", daemon=True).start()
+
+    @contextmanager
+    def use(self, name):
+        """Hält das Modell für die Dauer des Blocks geladen (kein Entladen, kein Verdrängen)."""
+        m = self.models[name]
+        with self._lock: m.busy += 1
+        try:
+            if not self.ensure_loaded(name): raise RuntimeError(f"Modell {name} nicht verfügbar")
+            yield
+        finally:
+            with self._lock: m.busy -= 1
+            m.last_used = time.monotonic()
+            self._run_pending(m)
+
+    def on_activity(self):
+        """Neue Aktivität (Hotkey, Log-Zeile): zuletzt genutzte, entladene Modelle vorladen."""
+        now = time.monotonic()
+        for m in self.models.values():
+            if not m.wanted: continue
+            if m.loaded: m.last_used = now
+            else: self.preload(m.name)
+
+    # --- Entladen ---
+    def unload(self, name, reason="", keep_wanted=True, reload=False, defer=True):
+        """Entlädt das Modell; mit reload wird es danach (z.B. mit neuer Config) neu vorgeladen.
+
+        Blockiert nie auf ein laufendes Laden: lädt oder arbeitet das Modell gerade, wird das Entladen
+        vorgemerkt (defer) und danach nachgeholt. Config-Listener im Tk-Thread hängen so nicht.
+        """
+        m = self.models[name]
+        with self._lock:
+            if m.loading or m.busy:
+                if defer: m.pending = (reason, keep_wanted, reload or bool(m.pending and m.pending[2]))
+                return False
+        with m.lock:
+            if m.busy: return False
+            unloaded = m.loaded
+            if unloaded:
+                mem = m.memory_mb()
+                try: m._unload()
+                except Exception as e: log_message(f"Modell {name} nicht sauber entladen: {e}", level="WARNING")
+                m.loaded = False
+                m.unloads += 1
+            if not keep_wanted: m.wanted = False
+        if unloaded:
+            release_torch_memory()
+            log_message(f"Modell entladen: {name} ({reason})", mem_mb=f"{mem:.0f}")
+        # Eigener Thread statt preload(): der läuft evtl. gerade selbst noch (preloading gesetzt)
+        if reload and m.wanted: threading.Thread(target=self.ensure_loaded, args=(name,), name=f"Reload-{name}", daemon=True).start()
+        return unloaded
+
+    def _run_pending(self, m):
+        with self._lock:
+            if m.pending is None or m.busy or m.loading: return
+            (reason, keep_wanted, reload), m.pending = m.pending, None
+        self.unload(m.name, reason, keep_wanted, reload)
+
+    def _make_room(self, keep=None, extra_mb=0.0):
+        """Verdrängt die am längsten ungenutzten Modelle, bis das Budget eingehalten wird."""
+        if self.budget_mb <= 0: return
+        while self.total_mb() + extra_mb > self.budget_mb:
+            victims = [m for m in self.models.values() if m.loaded and not m.busy and m is not keep]
+            if not victims: break
+            victim = min(victims, key=lambda m: m.last_used)
+            # Verdrängte Modelle nicht sofort wieder vorladen, sonst pendeln sie hin und her
+            if not self.unload(victim.name, "Budget", keep_wanted=False, defer=False): break
+
+    def sweep(self):
+        now = time.monotonic()
+        if self.idle_timeout > 0:
+            for m in list(self.models.values()):
+                if m.loaded and not m.busy and now - m.last_used > self.idle_timeout:
+                    self.unload(m.name, "inaktiv", defer=False)
+        self._make_room()
+        self._update_peak()
+
+    def start(self, interval=MODEL_SWEEP_INTERVAL):
+        if self._thread is not None: return
+        self._thread = threading.Thread(target=self._run, args=(interval,), name="ModelManager", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self, interval):
+        while not self._stop.wait(interval):
+            try: self.sweep()
+            except Exception as e: log_message(f"Modell-Verwaltung Fehler: {e}", level="WARNING")
+
+    # --- Statistik ---
+    def total_mb(self):
+        return sum(m.memory_mb() for m in self.models.values())
+
+    def _update_peak(self):
+        self.peak_mb = max(self.peak_mb, self.total_mb())
+
+    def report(self):
+        self._update_peak()
+        parts = [f"{m.name} {m.memory_mb():.0f} MB" if m.loaded else f"{m.name} entladen" for m in self.models.values()]
+        rss, _ = process_memory_mb()
+        return f"Modelle: {', '.join(parts) or '-'}  |  {self.total_mb():.0f} MB (Spitze {self.peak_mb:.0f} MB)  |  Prozess {rss:.0f} MB"
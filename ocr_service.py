@@ -1,35 +1,156 @@
-import easyocr  # NEU: Statt pytesseract
-import cv2
-import numpy as np
-import mss 
-import mss.tools 
 import os
-import google.generativeai as genai
+import json
+import time
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout, wait, FIRST_COMPLETED
 from PIL import Image
-from utils import log_message
+from utils import log_message, LazyModule, ScanCancelled
+from ocr_worker import OCRWorkerClient
+
+# Schwere Abhängigkeiten erst laden, wenn das jeweilige Backend wirklich benutzt wird
+# (EasyOCR zieht torch nach, Gemini das ganze Google-SDK) - das Fenster erscheint sofort.
+easyocr = LazyModule("easyocr")  # NEU: Statt pytesseract
+cv2 = LazyModule("cv2")
+np = LazyModule("numpy")
+mss = LazyModule("mss")
+genai = LazyModule("google.generativeai")
+# genai.configure setzt einen prozessweiten Client - nie aus mehreren Threads gleichzeitig
+_genai_lock = threading.Lock()
+
+PREVIEW_HEIGHT = 200
+EASYOCR_UPSCALE = 2.0  # Vergrößerung fürs EasyOCR-Eingabebild; Hybrid-OCR rechnet Zeilenboxen damit zurück
+
+class PreviewChannel:
+    """Begrenzte Queue für verkleinerte Debug-Frames von der Pipeline zum UI-Thread.
+
+    Ist die Queue voll, fliegt der älteste Frame raus - der Scan wartet nie auf die UI.
+    """
+    def __init__(self, maxsize=4):
+        self._queue = queue.Queue(maxsize=maxsize)
+
+    def publish(self, slot, rgb_frame):
+        while True:
+            try:
+                self._queue.put_nowait((slot, rgb_frame)); return
+            except queue.Full:
+                try: self._queue.get_nowait()
+                except queue.Empty: pass
+
+    def drain(self):
+        """Liefert pro Slot den neuesten Frame (nicht blockierend)."""
+        latest = {}
+        while True:
+            try: slot, frame = self._queue.get_nowait()
+            except queue.Empty: return latest
+            latest[slot] = frame
+
+class DebugImageWriter:
+    """Schreibt Debug-PNGs in einem Hintergrund-Thread statt im Scan-Pfad."""
+    def __init__(self, maxsize=4):
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+    def submit(self, path, img, rect=None):
+        if self._thread is None:
+            with self._start_lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="DebugImageWriter", daemon=True)
+                    self._thread.start()
+        try: self._queue.put_nowait((path, img, rect))
+        except queue.Full: pass  # Lieber ein Debug-Bild verlieren als den Scan bremsen
+
+    def _run(self):
+        while True:
+            path, img, rect = self._queue.get()
+            try:
+                if rect is not None:
+                    x, y, w, h = rect
+                    img = img.copy()
+                    cv2.rectangle(img, (x, y), (x+w, y+h), (0, 255, 0), 3)
+                cv2.imwrite(path, img)
+            except Exception as e: log_message(f"Debug-Bild nicht gespeichert ({path}): {e}", level="WARNING")
+
+def make_preview(img, height=PREVIEW_HEIGHT):
+    """Verkleinert ein BGR- oder Graustufenbild auf Vorschauhöhe und liefert RGB."""
+    h, w = img.shape[:2]
+    scale = min(1.0, height / float(h))
+    if scale < 1.0: img = cv2.resize(img, (max(1, int(w * scale)), height), interpolation=cv2.INTER_AREA)
+    code = cv2.COLOR_GRAY2RGB if img.ndim == 2 else cv2.COLOR_BGR2RGB
+    return cv2.cvtColor(img, code), scale
 
 class OCRExtractor:
-    def __init__(self, config):
+    def __init__(self, config, models):
         self.config = config
         
-        # --- EASYOCR INITIALISIERUNG (NEU) ---
-        # Wir laden Deutsch ('de') und Englisch ('en') in den Speicher.
-        # gpu=True beschleunigt es massiv, falls du eine NVIDIA Karte hast.
-        # Falls es Fehler gibt, setze gpu=False.
-        log_message("Lade EasyOCR Modelle (das kann beim ersten Mal kurz dauern)...")
-        try:
-            self.reader = easyocr.Reader(['de', 'en'], gpu=True)
-            log_message("EasyOCR bereit.")
-        except Exception as e:
-            log_message(f"EasyOCR GPU Fehler (nutze CPU): {e}")
-            self.reader = easyocr.Reader(['de', 'en'], gpu=False)
-        # -------------------------------------
+        # EasyOCR wird vom ModelManager verwaltet (nach Leerlauf entladen, bei Bedarf neu geladen)
+        self.reader = None
+        self.models = models
+        models.register("easyocr", load=self._init_reader, unload=self._release_reader, memory=self._reader_memory)
         
-        # Gemini Init (bleibt bestehen als Premium Option)
+        # Gemini (bleibt bestehen als Premium Option) - wird beim ersten Gebrauch eingerichtet
         self.ai_model = None
-        self._setup_ai()
 
-        self.templates = self._load_templates()
+        # Templates (cv2) erst beim Backend-Start bzw. beim ersten Scan - nicht im Konstruktor
+        self.templates = None
+        self._templates_loaded = False
+
+        # Debug-Vorschau: Frames im Speicher an die UI, PNGs nur optional und asynchron
+        self.previews = PreviewChannel()
+        self.debug_writer = DebugImageWriter()
+
+        # Hybrid- und Hedged-OCR: getrennte Pools, damit verworfene Gemini-Anfragen (laufen bis zu
+        # ai_timeout weiter, cancel() stoppt sie nicht) den lokalen EasyOCR-Lauf nicht blockieren
+        self._local_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="OCRLocal")
+        self._ai_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="OCRGemini")
+        # full_*: Gemini auf dem ganzen Ausschnitt (KI-/Hedged-Modus) - Vergleichswert für die Ersparnis
+        self.hybrid_stats = {"scans": 0, "local_only": 0, "lines": 0, "escalated_lines": 0, "hybrid_seconds": 0.0,
+                             "gemini_calls": 0, "gemini_seconds": 0.0, "fallbacks": 0, "full_calls": 0, "full_seconds": 0.0}
+        self.hedge_stats = {"runs": 0, "local_wins": 0, "ai_wins": 0, "failures": 0}
+
+    def _init_reader(self):
+        """Lädt EasyOCR im Prozess oder (ocr_isolation) in einem eigenen Worker-Prozess."""
+        if self.config.get("ocr_isolation", False):
+            # Der Worker lädt das Modell selbst im Hintergrund, readtext() wartet bei Bedarf darauf
+            self.reader = OCRWorkerClient(['de', 'en'], gpu=True)
+        else:
+            # --- EASYOCR INITIALISIERUNG (NEU) ---
+            # Wir laden Deutsch ('de') und Englisch ('en') in den Speicher.
+            # gpu=True beschleunigt es massiv, falls du eine NVIDIA Karte hast.
+            # Falls es Fehler gibt, setze gpu=False.
+            log_message("Lade EasyOCR Modelle (das kann beim ersten Mal kurz dauern)...")
+            try:
+                self.reader = easyocr.Reader(['de', 'en'], gpu=True)
+                log_message("EasyOCR bereit.")
+            except Exception as e:
+                log_message(f"EasyOCR GPU Fehler (nutze CPU): {e}")
+                self.reader = easyocr.Reader(['de', 'en'], gpu=False)
+            # -------------------------------------
+
+    def _release_reader(self):
+        reader, self.reader = self.reader, None
+        # Herunterfahren dauert bis zu ein paar Sekunden - nicht im (evtl. Tk-)Thread des Config-Listeners
+        if isinstance(reader, OCRWorkerClient): threading.Thread(target=reader.close, name="OCRWorkerClose", daemon=True).start()
+
+    def _reader_memory(self):
+        # Im Worker-Modus liegt das Modell im anderen Prozess, dessen RSS kommt mit jeder Antwort
+        if isinstance(self.reader, OCRWorkerClient): return self.reader.stats.get("memory_mb")
+        return None
+
+    def _readtext(self, img, **kwargs):
+        with self.models.use("easyocr"):
+            return self.reader.readtext(img, **kwargs)
+
+    def backend_steps(self):
+        """(Name, Init-Funktion) der OCR-Backends, die laut Config beim Start vorbereitet werden."""
+        c = self.config
+        steps = [("Templates", self._prepare_templates)]
+        if not c.get("use_ai_ocr", False) or c.get("ocr_hedged", False):
+            steps.append(("EasyOCR", lambda: self.models.ensure_loaded("easyocr")))
+        if (c.get("use_ai_ocr", False) or c.get("hybrid_ocr", False)) and c.get("gemini_api_key", "").strip():
+            steps.append(("Gemini", self._setup_ai))
+        return steps
 
     def _setup_ai(self):
         """Konfiguriert die KI, falls ein Key da ist."""
@@ -37,16 +158,31 @@ class OCRExtractor:
         model_name = self.config.get("gemini_model_name", "models/gemini-1.5-flash")
         
         if key:
-            try:
-                genai.configure(api_key=key)
-                self.ai_model = genai.GenerativeModel(model_name)
-            except Exception as e:
-                log_message(f"Fehler bei KI-Start: {e}")
+            with _genai_lock:
+                if self.ai_model is not None: return True  # parallel schon eingerichtet
+                try:
+                    genai.configure(api_key=key)
+                    self.ai_model = genai.GenerativeModel(model_name)
+                except Exception as e:
+                    log_message(f"Fehler bei KI-Start: {e}", level="ERROR")
+        return self.ai_model is not None
+
+    def on_config_changed(self, snapshot, changed):
+        """Übernimmt einen neuen Config-Snapshot; der KI-Client wird nur bei Bedarf neu gebaut."""
+        self.config = snapshot
+        if changed & {"gemini_api_key", "gemini_model_name"}:
+            self.ai_model = None  # beim nächsten Gebrauch mit neuem Key/Modell neu aufbauen
+        if "ocr_isolation" in changed:
+            # Über den ModelManager: wartet auf laufende Scans und hält Speicherstand und Sperren konsistent
+            self.models.unload("easyocr", "OCR-Isolation umgeschaltet", reload=True)
 
     def fetch_available_models(self, api_key):
         """Hilfsfunktion für die UI."""
         try:
-            genai.configure(api_key=api_key)
+            with _genai_lock:
+                genai.configure(api_key=api_key)
+                # Der globale Client nutzt jetzt diesen Key - KI beim nächsten Gebrauch mit dem Config-Key neu einrichten
+                self.ai_model = None
             models = []
             for m in genai.list_models():
                 if 'generateContent' in m.supported_generation_methods:
@@ -56,6 +192,17 @@ class OCRExtractor:
         except Exception as e:
             return []
 
+    def reload_templates(self):
+        """Nach der Kalibrierung: Templates neu von der Platte lesen."""
+        self.templates = self._load_templates()
+        self._templates_loaded = True
+        return self.templates is not None
+
+    def _prepare_templates(self):
+        # Fehlende Templates sind kein Backend-Fehler - vor der ersten Kalibrierung gibt es keine
+        if not self.reload_templates(): log_message("Noch keine Dialog-Templates - bitte in der Schmiede kalibrieren.")
+        return True
+
     def _load_templates(self):
         template_dir = os.path.join(os.getcwd(), "templates")
         templates = {}
@@ -69,9 +216,7 @@ class OCRExtractor:
         return templates if (success and len(templates) == 4) else None
     
     def get_monitor_screenshot(self):
-        try:
-            mon_idx = int(self.config.get("monitor_index", 1))
-        except: mon_idx = 1
+        mon_idx = self.config.monitor_index
         try:
             with mss.mss() as sct:
                 if mon_idx >= len(sct.monitors): mon_idx = 1
@@ -85,20 +230,27 @@ class OCRExtractor:
         return cv2.bitwise_not(cv2.bitwise_or(mask_yellow, mask_white))
 
     def crop_to_text_content(self, binary_img):
+        box = self._text_content_box(binary_img)
+        if box is None: return binary_img
+        x1, y1, x2, y2 = box
+        return binary_img[y1:y2, x1:x2]
+
+    def _text_content_box(self, binary_img, pad=10):
+        """(x1, y1, x2, y2) des Textinhalts im Binärbild oder None."""
         inverted = cv2.bitwise_not(binary_img)
         contours, _ = cv2.findContours(inverted, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-        if not contours: return binary_img 
+        if not contours: return None
         min_x, min_y = binary_img.shape[1], binary_img.shape[0]; max_x = max_y = 0; found = False
         for c in contours:
             if cv2.contourArea(c) < 50: continue
             x, y, w, h = cv2.boundingRect(c)
             min_x = min(min_x, x); min_y = min(min_y, y); max_x = max(max_x, x + w); max_y = max(max_y, y + h); found = True
-        if not found: return binary_img
-        pad = 10
-        return binary_img[max(0, min_y-pad):min(binary_img.shape[0], max_y+pad), max(0, min_x-pad):min(binary_img.shape[1], max_x+pad)]
+        if not found: return None
+        return max(0, min_x-pad), max(0, min_y-pad), min(binary_img.shape[1], max_x+pad), min(binary_img.shape[0], max_y+pad)
 
     def find_text_region(self, img):
         h_img, w_img = img.shape[:2]
+        if not self._templates_loaded: self.reload_templates()
         if self.templates is None: return None, None
         gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
         positions = {}
@@ -112,14 +264,208 @@ class OCRExtractor:
             def get_c(k, p): return p[0] + self.templates[k].shape[1]//2, p[1] + self.templates[k].shape[0]//2
             c_tl = get_c("top_left", positions["top_left"]); c_tr = get_c("top_right", positions["top_right"])
             c_bl = get_c("bottom_left", positions["bottom_left"]); c_br = get_c("bottom_right", positions["bottom_right"])
-            pt = int(self.config.get("padding_top", 10)); pb = int(self.config.get("padding_bottom", 20))
-            pl = int(self.config.get("padding_left", 10)); pr = int(self.config.get("padding_right", 50))
+            pt, pb, pl, pr = self.config.paddings
             x1 = max(0, int(min(c_tl[0], c_bl[0]) - pl)); y1 = max(0, int(min(c_tl[1], c_tr[1]) - pt))
             x2 = min(w_img, int(max(c_tr[0], c_br[0]) + pr)); y2 = min(h_img, int(max(c_bl[1], c_br[1]) + pb))
             if (x2-x1) < 50 or (y2-y1) < 50: return None, None
             return img[y1:y2, x1:x2], (x1, y1, x2-x1, y2-y1)
         except: return None, None
 
+    def _publish_ocr_input(self, img):
+        try:
+            self.previews.publish("ocr_input", make_preview(img)[0])
+            if self.config.get("debug_save_images", False):
+                self.debug_writer.submit("debug_ocr_input.png", img)
+        except: pass
+
+    def prepare_easyocr_input(self, cropped_img):
+        return self._prepare_easyocr_input(cropped_img)[0]
+
+    def _prepare_easyocr_input(self, cropped_img):
+        """Wie prepare_easyocr_input, plus (x, y) des Textausschnitts im Farbbild für die Rückrechnung."""
+        # --- START EASYOCR LOGIK ---
+        processed_img = self.isolate_text_colors(cropped_img)
+        box = self._text_content_box(processed_img)
+        origin = (0, 0)
+        if box is not None:
+            x1, y1, x2, y2 = box
+            processed_img, origin = processed_img[y1:y2, x1:x2], (x1, y1)
+        
+        # EasyOCR mag das Bild oft lieber ohne extremes Upscaling, aber probieren wir es
+        # moderat. Faktor 2 ist meistens gut für EasyOCR bei Pixel-Art.
+        processed_img = cv2.resize(processed_img, None, fx=EASYOCR_UPSCALE, fy=EASYOCR_UPSCALE, interpolation=cv2.INTER_LINEAR)
+        
+        # Wichtig: EasyOCR kommt besser mit Graustufen oder Farbe klar als mit 
+        # hartem Schwarz-Weiß Thresholding, aber da wir die Farben schon gefiltert haben,
+        # behalten wir das binäre Bild bei, da es sehr sauber ist.
+        _, processed_img = cv2.threshold(processed_img, 127, 255, cv2.THRESH_BINARY)
+        return processed_img, origin
+
+    def run_easyocr(self, processed_img):
+        # detail=0 gibt uns direkt eine Liste von Strings zurück ['Wort1', 'Wort2']
+        # paragraph=False ist Standard, das ist okay, wir joinen alles.
+        result_list = self._readtext(processed_img, detail=0)
+        
+        # Liste zu einem String zusammenfügen
+        return " ".join(result_list)
+
+    def run_hybrid_recognition(self, processed_img, cancel=None, color_img=None, origin=(0, 0)):
+        """EasyOCR mit Konfidenzen; nur Zeilen unter der Schwelle gehen gesammelt an Gemini.
+
+        Mit color_img (Dialog-Ausschnitt in Farbe, origin = Lage des EasyOCR-Bilds darin) bekommt
+        Gemini die Zeilen in Originalfarben statt binarisiert - wichtig für Umlautpunkte.
+        """
+        scan_start = time.perf_counter()
+        try:
+            results = self._readtext(processed_img, detail=1)
+        except Exception as e:
+            log_message(f"EasyOCR Fehler: {e}", level="ERROR")
+            return "Kein Text gefunden", "Fehler"
+        if not results: return "Kein Text gefunden", "EasyOCR"
+
+        stats = self.hybrid_stats
+        threshold = float(self.config.get("hybrid_confidence", 0.6))
+        texts = [text for _, text, _ in results]
+        weak = [i for i, (_, _, conf) in enumerate(results) if conf < threshold]
+        stats["scans"] += 1; stats["lines"] += len(results); stats["escalated_lines"] += len(weak)
+        if stats["scans"] % 10 == 0: log_message(self.hybrid_report())
+        if not weak:
+            stats["local_only"] += 1; stats["hybrid_seconds"] += time.perf_counter() - scan_start
+            return " ".join(texts), "EasyOCR"
+
+        # Abgelöster Scan: keine Gemini-Anfrage mehr
+        if cancel: cancel.check()
+        if color_img is not None:
+            crops = [self._line_crop(color_img, results[i][0], origin=origin, scale=EASYOCR_UPSCALE) for i in weak]
+        else: crops = [self._line_crop(processed_img, results[i][0]) for i in weak]
+        start = time.perf_counter()
+        fixed = self._recognize_lines_ai(crops, float(self.config.get("hybrid_timeout", 8.0)))
+        elapsed = time.perf_counter() - start
+        stats["hybrid_seconds"] += time.perf_counter() - scan_start
+        log_message("Hybrid-OCR", lines=len(results), escalated=len(weak), gemini_ms=int(elapsed * 1000), ok=fixed is not None)
+        if fixed is None:
+            stats["fallbacks"] += 1
+            return " ".join(texts), "EasyOCR (Hybrid-Fallback)"
+        stats["gemini_calls"] += 1; stats["gemini_seconds"] += elapsed
+        for i, text in zip(weak, fixed):
+            if text.strip(): texts[i] = text.strip()
+        return " ".join(texts), "EasyOCR + Gemini"
+
+    def _line_crop(self, img, bbox, pad=4, origin=(0, 0), scale=1.0):
+        """Zeilenausschnitt; bbox in Koordinaten des um scale vergrößerten Bilds ab origin."""
+        xs = [int(origin[0] + p[0] / scale) for p in bbox]; ys = [int(origin[1] + p[1] / scale) for p in bbox]
+        h, w = img.shape[:2]
+        return img[max(0, min(ys)-pad):min(h, max(ys)+pad), max(0, min(xs)-pad):min(w, max(xs)+pad)]
+
+    def _recognize_lines_ai(self, crops, timeout):
+        """Ein einziger Gemini-Request für alle Zeilen. None bei Fehler oder Timeout."""
+        if not self.ai_model:
+            self._setup_ai()
+            if not self.ai_model: return None
+        prompt = (f"Du bekommst {len(crops)} Bildausschnitte, jeder enthält eine Zeile deutschen Quest-Text. "
+                  f"Antworte NUR mit einem JSON-Array aus genau {len(crops)} Strings in derselben Reihenfolge. "
+                  "Achte penibel auf deutsche Umlaute.")
+        parts = [prompt] + [Image.fromarray(cv2.cvtColor(c, cv2.COLOR_BGR2RGB) if c.ndim == 3 else c) for c in crops]
+        future = self._ai_pool.submit(self.ai_model.generate_content, parts, request_options={"timeout": timeout})
+        try:
+            raw = future.result(timeout=timeout).text.strip()
+        except FutureTimeout:
+            future.cancel()
+            log_message(f"Gemini Timeout nach {timeout}s, nutze lokales Ergebnis.", level="WARNING")
+            return None
+        except Exception as e:
+            log_message(f"Gemini Zeilen-Anfrage fehlgeschlagen: {e}", level="WARNING")
+            return None
+        if raw.startswith("```"): raw = raw.strip("`").split("\n", 1)[-1]
+        try: lines = json.loads(raw)
+        except ValueError: return None
+        if not isinstance(lines, list) or len(lines) != len(crops): return None
+        return [str(line) for line in lines]
+
+    def _record_full_ai(self, elapsed):
+        self.hybrid_stats["full_calls"] += 1; self.hybrid_stats["full_seconds"] += elapsed
+
+    def hybrid_report(self):
+        s = self.hybrid_stats
+        if not s["scans"]: return "Hybrid-OCR: noch keine Scans"
+        avg = s["gemini_seconds"] / s["gemini_calls"] if s["gemini_calls"] else 0.0
+        scan_avg = s["hybrid_seconds"] / s["scans"]
+        # Vergleich: Gemini auf dem ganzen Ausschnitt - gemessen, sonst grob wie eine Zeilen-Anfrage
+        if s["full_calls"]: full_avg, basis = s["full_seconds"] / s["full_calls"], "gemessen"
+        elif s["gemini_calls"]: full_avg, basis = avg, "geschätzt"
+        else: full_avg = None
+        saved = (f", gespart {full_avg - scan_avg:.2f}s/Scan ggü. Gemini komplett (Ø {full_avg:.2f}s, {basis})"
+                 if full_avg is not None else ", Ersparnis: noch kein Gemini-Vergleichswert")
+        return (f"Hybrid-OCR: {s['scans']} Scans, {s['local_only']} ohne Gemini "
+                f"({100 * s['local_only'] / s['scans']:.0f}% Anfragen gespart), "
+                f"{s['escalated_lines']}/{s['lines']} Zeilen eskaliert "
+                f"({100 * s['escalated_lines'] / max(1, s['lines']):.0f}%), Ø Gemini {avg:.2f}s, "
+                f"Ø Scan {scan_avg:.2f}s{saved}, {s['fallbacks']} Fallbacks")
+
+    @staticmethod
+    def is_good_result(text):
+        """Grober Qualitätscheck: genug Text, keine Fehlermeldung, überwiegend Buchstaben."""
+        if not text or text.startswith("Fehler") or "Kein Text" in text: return False
+        stripped = text.strip()
+        if len(stripped) < 5: return False
+        letters = sum(ch.isalpha() for ch in stripped)
+        return letters / len(stripped.replace(" ", "")) >= 0.6
+
+    def compress_for_upload(self, img_crop, max_width=1024, quality=80):
+        """Verkleinert den Ausschnitt und kodiert ihn als JPEG-Blob (deutlich kleiner als PNG)."""
+        h, w = img_crop.shape[:2]
+        if w > max_width:
+            img_crop = cv2.resize(img_crop, (max_width, max(1, int(h * max_width / w))), interpolation=cv2.INTER_AREA)
+        ok, buf = cv2.imencode(".jpg", img_crop, [cv2.IMWRITE_JPEG_QUALITY, quality])
+        if not ok: raise ValueError("JPEG-Kodierung fehlgeschlagen")
+        return {"mime_type": "image/jpeg", "data": buf.tobytes()}
+
+    def _hedge_local(self, cropped_img):
+        return self.run_easyocr(self.prepare_easyocr_input(cropped_img))
+
+    def _hedge_ai(self, cropped_img, timeout):
+        if not self.ai_model:
+            self._setup_ai()
+            if not self.ai_model: return None
+        prompt = "Lies den Quest-Text aus diesem Bild. Gib NUR den Text zurück, ohne Einleitung. Ignoriere Interface-Elemente. Achte penibel auf deutsche Umlaute."
+        start = time.perf_counter()
+        response = self.ai_model.generate_content([prompt, self.compress_for_upload(cropped_img)],
+                                                  request_options={"timeout": timeout})
+        self._record_full_ai(time.perf_counter() - start)
+        return response.text.strip()
+
+    def run_hedged_recognition(self, cropped_img, cancel=None):
+        """Startet EasyOCR und Gemini gleichzeitig; das erste Ergebnis, das is_good_result besteht, gewinnt.
+
+        Der Verlierer wird abgebrochen, falls er noch wartet, sonst wird sein Ergebnis verworfen.
+        """
+        timeout = float(self.config.get("ai_timeout", 15.0))
+        self.hedge_stats["runs"] += 1
+        pending = {self._local_pool.submit(self._hedge_local, cropped_img): "EasyOCR",
+                   self._ai_pool.submit(self._hedge_ai, cropped_img, timeout): "Gemini AI"}
+        deadline = time.monotonic() + timeout
+        while pending:
+            # In kurzen Scheiben warten, damit ein Abbruch nicht bis zum Timeout hängt
+            remaining = deadline - time.monotonic()
+            if remaining <= 0: break
+            done, _ = wait(pending, timeout=min(0.1, remaining), return_when=FIRST_COMPLETED)
+            if cancel and cancel.cancelled:
+                for other in pending: other.cancel()
+                raise ScanCancelled()
+            if not done: continue
+            for future in done:
+                source = pending.pop(future)
+                try: text = future.result()
+                except Exception as e:
+                    log_message(f"Hedged OCR: {source} fehlgeschlagen: {e}", level="WARNING"); continue
+                if self.is_good_result(text):
+                    for other in pending: other.cancel()
+                    self.hedge_stats["local_wins" if source == "EasyOCR" else "ai_wins"] += 1
+                    return text, f"{source} (Hedged)"
+        for other in pending: other.cancel()
+        self.hedge_stats["failures"] += 1
+        return "Kein Text gefunden", "Hedged"
+
     def run_ai_recognition(self, img_crop):
         if not self.ai_model: 
             self._setup_ai() 
@@ -128,65 +474,62 @@ class OCRExtractor:
             rgb_img = cv2.cvtColor(img_crop, cv2.COLOR_BGR2RGB)
             pil_img = Image.fromarray(rgb_img)
             prompt = "Lies den Quest-Text aus diesem Bild. Gib NUR den Text zurück, ohne Einleitung. Ignoriere Interface-Elemente. Achte penibel auf deutsche Umlaute."
-            response = self.ai_model.generate_content([prompt, pil_img])
+            start = time.perf_counter()
+            response = self.ai_model.generate_content([prompt, pil_img],
+                                                      request_options={"timeout": float(self.config.get("ai_timeout", 15.0))})
+            self._record_full_ai(time.perf_counter() - start)
             return response.text.strip()
         except Exception as e:
-            log_message(f"KI Anfrage fehlgeschlagen: {e}")
+            log_message(f"KI Anfrage fehlgeschlagen: {e}", level="ERROR")
             return f"Fehler: {e}"
 
-    def run_ocr(self):
+    def run_ocr(self, cancel=None):
+        """Screenshot -> Dialogbereich -> Texterkennung. cancel (CancelToken) wird zwischen den Schritten geprüft."""
         img = self.get_monitor_screenshot()
         if img is None: return "Kein Text gefunden", "System"
+        if cancel: cancel.check(); cancel.mark_captured()
 
         cropped_img, coords = self.find_text_region(img)
         if cropped_img is None:
             log_message("Kein Dialog-Template erkannt.")
             return "Kein Text gefunden", "System"
+        if cancel: cancel.check()
 
-        if self.config.get("debug_mode", False):
+        if self.config.debug_mode:
             try:
+                # Erst verkleinern, dann den Rahmen zeichnen - keine Kopie in voller Auflösung
                 (x, y, w, h) = coords
-                debug_full = img.copy()
-                cv2.rectangle(debug_full, (x, y), (x+w, y+h), (0, 255, 0), 3)
-                cv2.imwrite("debug_detection_view.png", debug_full)
-                cv2.imwrite("debug_ocr_input.png", cropped_img)
+                view, scale = make_preview(img)
+                cv2.rectangle(view, (int(x*scale), int(y*scale)), (int((x+w)*scale), int((y+h)*scale)), (0, 255, 0), 2)
+                self.previews.publish("detection", view)
+                if self.config.get("debug_save_images", False):
+                    self.debug_writer.submit("debug_detection_view.png", img, coords)
             except: pass
 
-        use_ai = self.config.get("use_ai_ocr", False)
+        use_ai = self.config.use_ai_ocr
         
         if use_ai:
+            if self.config.debug_mode: self._publish_ocr_input(cropped_img)
+            if self.config.get("ocr_hedged", False):
+                return self.run_hedged_recognition(cropped_img, cancel)
             log_message(f"Starte KI-Erkennung ({self.config.get('gemini_model_name', 'Default')})...")
-            return self.run_ai_recognition(cropped_img), "Gemini AI"
+            text = self.run_ai_recognition(cropped_img)
+            # Fehlertexte nicht vorlesen lassen
+            if text.startswith("Fehler:"): return "Kein Text gefunden", "Gemini AI (Fehler)"
+            return text, "Gemini AI"
         else:
-            # --- START EASYOCR LOGIK ---
-            processed_img = self.isolate_text_colors(cropped_img)
-            processed_img = self.crop_to_text_content(processed_img)
-            
-            # EasyOCR mag das Bild oft lieber ohne extremes Upscaling, aber probieren wir es
-            # moderat. Faktor 2 ist meistens gut für EasyOCR bei Pixel-Art.
-            processed_img = cv2.resize(processed_img, None, fx=2.0, fy=2.0, interpolation=cv2.INTER_LINEAR)
-            
-            # Wichtig: EasyOCR kommt besser mit Graustufen oder Farbe klar als mit 
-            # hartem Schwarz-Weiß Thresholding, aber da wir die Farben schon gefiltert haben,
-            # behalten wir das binäre Bild bei, da es sehr sauber ist.
-            _, processed_img = cv2.threshold(processed_img, 127, 255, cv2.THRESH_BINARY)
-            
-            if self.config.get("debug_mode", False):
-                try: cv2.imwrite("debug_ocr_input.png", processed_img)
-                except: pass
+            processed_img, origin = self._prepare_easyocr_input(cropped_img)
+            if self.config.debug_mode: self._publish_ocr_input(processed_img)
+
+            if self.config.get("hybrid_ocr", False):
+                return self.run_hybrid_recognition(processed_img, cancel, color_img=cropped_img, origin=origin)
 
             try:
-                # detail=0 gibt uns direkt eine Liste von Strings zurück ['Wort1', 'Wort2']
-                # paragraph=False ist Standard, das ist okay, wir joinen alles.
-                result_list = self.reader.readtext(processed_img, detail=0)
-                
-                # Liste zu einem String zusammenfügen
-                full_text = " ".join(result_list)
-                
+                full_text = self.run_easyocr(processed_img)
                 if not full_text.strip():
                     return "Kein Text gefunden", "EasyOCR"
                     
                 return full_text, "EasyOCR"
             except Exception as e:
-                log_message(f"EasyOCR Fehler: {e}")
+                log_message(f"EasyOCR Fehler: {e}", level="ERROR")
                 return "Kein Text gefunden", "Fehler"
@@ -0,0 +1,168 @@
+import atexit
+import multiprocessing
+import threading
+import time
+from multiprocessing import shared_memory
+from utils import log_message, process_memory_mb, LazyModule
+
+np = LazyModule("numpy")
+
+# EasyOCR läuft hier in einem eigenen Prozess: readtext blockiert dann weder den Tk-Mainloop
+# noch den Hotkey-Hook oder die TTS-Threads (eigener GIL). Frames gehen über Shared Memory.
+OCR_WORKER_SHM_BYTES = 32 * 1024 * 1024
+OCR_WORKER_LOAD_TIMEOUT = 600
+OCR_WORKER_MAX_RESTARTS = 3
+OCR_WORKER_RESTART_WINDOW = 300
+
+def ocr_worker_main(conn, shm_name, languages, gpu):
+    """Einstiegspunkt des Worker-Prozesses (muss auf Modulebene liegen, wegen spawn)."""
+    import easyocr
+    try:
+        reader = easyocr.Reader(languages, gpu=gpu)
+    except Exception:
+        reader = easyocr.Reader(languages, gpu=False)
+    shm = shared_memory.SharedMemory(name=shm_name)
+    conn.send(("ready", process_memory_mb()[0]))
+    try:
+        while True:
+            msg = conn.recv()
+            if msg is None: break
+            cmd, payload = msg
+            if cmd == "attach":
+                shm.close()
+                shm = shared_memory.SharedMemory(name=payload)
+                conn.send(("ok", None))
+            elif cmd == "readtext":
+                shape, dtype, kwargs = payload
+                try:
+                    # Kopie, damit der Client den Puffer sofort wieder beschreiben darf
+                    frame = np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf).copy()
+                    # Speicherstand des Workers gleich mitschicken (für die Modell-Verwaltung)
+                    conn.send(("ok", (reader.readtext(frame, **kwargs), process_memory_mb()[0])))
+                except Exception as e:
+                    conn.send(("error", str(e)))
+    except (EOFError, KeyboardInterrupt): pass
+    finally:
+        shm.close()
+
+class OCRWorkerClient:
+    """Drop-in für easyocr.Reader.readtext, das die Erkennung in einem Worker-Prozess ausführt.
+
+    Der Prozess wird überwacht: stirbt er oder hängt er, wird er automatisch neu gestartet
+    (höchstens OCR_WORKER_MAX_RESTARTS Mal in OCR_WORKER_RESTART_WINDOW Sekunden).
+    """
+    def __init__(self, languages, gpu=True, request_timeout=60):
+        self.languages = list(languages)
+        self.gpu = gpu
+        self.request_timeout = request_timeout
+        self._ctx = multiprocessing.get_context("spawn")
+        self._lock = threading.Lock()
+        self._proc = None
+        self._conn = None
+        self._shm = None
+        self._ready = False
+        self._restarts = []
+        self.stats = {"requests": 0, "restarts": 0, "last_latency": 0.0, "memory_mb": 0.0}
+        self.start()
+        atexit.register(self.close)
+
+    # --- Prozess-Verwaltung ---
+    def start(self):
+        """Startet den Worker (kehrt sofort zurück, das Modell lädt im Hintergrund)."""
+        if self._shm is None:
+            self._shm = shared_memory.SharedMemory(create=True, size=OCR_WORKER_SHM_BYTES)
+        parent_conn, child_conn = self._ctx.Pipe()
+        self._proc = self._ctx.Process(target=ocr_worker_main, name="OCRWorker",
+                                       args=(child_conn, self._shm.name, self.languages, self.gpu), daemon=True)
+        self._proc.start()
+        child_conn.close()
+        self._conn = parent_conn
+        self._ready = False
+        log_message(f"OCR-Worker gestartet (PID {self._proc.pid}).")
+
+    def _kill(self):
+        try:
+            if self._conn: self._conn.close()
+        except: pass
+        if self._proc is not None and self._proc.is_alive():
+            self._proc.terminate()
+            self._proc.join(1)
+            if self._proc.is_alive(): self._proc.kill(); self._proc.join(1)
+        self._proc = None
+        self._conn = None
+        self._ready = False
+
+    def _restart(self, reason):
+        now = time.monotonic()
+        self._restarts = [t for t in self._restarts if now - t < OCR_WORKER_RESTART_WINDOW]
+        self._kill()
+        if len(self._restarts) >= OCR_WORKER_MAX_RESTARTS:
+            log_message(f"OCR-Worker ausgefallen ({reason}), zu viele Neustarts - gebe auf.", level="ERROR")
+            return
+        self._restarts.append(now)
+        self.stats["restarts"] += 1
+        log_message(f"OCR-Worker ausgefallen ({reason}), starte neu...", level="WARNING")
+        self.start()
+
+    def close(self):
+        atexit.unregister(self.close)  # sonst sammeln sich geschlossene Clients über jedes Neuladen an
+        with self._lock:
+            try:
+                if self._conn: self._conn.send(None)
+            except: pass
+            if self._proc is not None: self._proc.join(1)
+            self._kill()
+            if self._shm is not None:
+                self._shm.close()
+                try: self._shm.unlink()
+                except: pass
+                self._shm = None
+
+    def is_alive(self):
+        return self._proc is not None and self._proc.is_alive()
+
+    # --- Kommunikation ---
+    def _wait_ready(self):
+        if self._ready: return
+        if not self._conn.poll(OCR_WORKER_LOAD_TIMEOUT): raise TimeoutError("Modell im Worker nicht geladen")
+        status, memory = self._conn.recv()
+        if status != "ready": raise RuntimeError(f"Unerwartete Antwort: {status}")
+        self.stats["memory_mb"] = memory
+        self._ready = True
+
+    def _request(self, cmd, payload, timeout):
+        self._conn.send((cmd, payload))
+        if not self._conn.poll(timeout): raise TimeoutError(f"OCR-Worker antwortet nicht ({timeout}s)")
+        status, result = self._conn.recv()
+        if status == "error": raise RuntimeError(result)
+        return result
+
+    def _ensure_capacity(self, nbytes):
+        if nbytes <= self._shm.size: return
+        new_shm = shared_memory.SharedMemory(create=True, size=max(nbytes, self._shm.size * 2))
+        self._request("attach", new_shm.name, self.request_timeout)
+        self._shm.close()
+        try: self._shm.unlink()
+        except: pass
+        self._shm = new_shm
+
+    def readtext(self, img, **kwargs):
+        img = np.ascontiguousarray(img)
+        with self._lock:
+            if self._proc is None: raise RuntimeError("OCR-Worker nicht verfügbar")
+            if not self.is_alive():
+                self._restart("Prozess beendet")
+                if self._proc is None: raise RuntimeError("OCR-Worker nicht verfügbar")
+            start = time.perf_counter()
+            try:
+                self._wait_ready()
+                self._ensure_capacity(img.nbytes)
+                np.ndarray(img.shape, dtype=img.dtype, buffer=self._shm.buf)[...] = img
+                result, self.stats["memory_mb"] = self._request("readtext", (img.shape, img.dtype.str, kwargs), self.request_timeout)
+            except (EOFError, OSError, TimeoutError) as e:
+                reason = str(e) or type(e).__name__
+                self._restart(reason)
+                raise RuntimeError(f"OCR-Worker Fehler: {reason}")
+            self.stats["requests"] += 1
+            self.stats["last_latency"] = time.perf_counter() - start
+            return result
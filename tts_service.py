@@ -1,50 +1,134 @@
-import requests
-import pygame
 import threading
 import time
 import re
 import os
-import pyttsx3
-import torch # Für GPU Check
-from requests.exceptions import RequestException
-from utils import log_message
+import wave
+from utils import log_message, process_memory_mb, LazyModule
+
+# Erst beim ersten Gebrauch importiert: pygame beim Abspielen, pyttsx3 für die Systemstimme,
+# requests für ElevenLabs. torch/TTS lädt nur XTTS selbst.
+requests = LazyModule("requests")
+pygame = LazyModule("pygame")
+pyttsx3 = LazyModule("pyttsx3")
+
+XTTS_MODEL_NAME = "tts_models/multilingual/multi-dataset/xtts_v2"
+
+def xtts_mode(config):
+    """Betriebsart für XTTS: "cuda", "cpu-int8" (optimiert) oder "cpu-fp32"."""
+    import torch
+    if torch.cuda.is_available(): return "cuda"
+    return "cpu-int8" if config.get("xtts_cpu_optimized", False) else "cpu-fp32"
+
+def optimize_xtts_for_cpu(tts, threads=0):
+    """Quantisiert die nn.Linear-Schichten dynamisch nach int8 und legt die Torch-Threads fest."""
+    import torch
+    # Ohne Vorgabe: physische Kerne (grob die Hälfte der logischen), Hyperthreading bringt bei GEMM kaum etwas
+    threads = int(threads) or max(1, (os.cpu_count() or 2) // 2)
+    torch.set_num_threads(threads)  # prozessweit - gilt auch für EasyOCR im selben Prozess
+    model = tts.synthesizer.tts_model
+    model.eval()
+    torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8, inplace=True)
+    return threads
+
+def wav_duration(path):
+    try:
+        with wave.open(path, "rb") as w: return w.getnframes() / float(w.getframerate())
+    except: return 0.0
 
 class TTSService:
-    def __init__(self, config):
+    def __init__(self, config, audio_cache, models):
         self.config = config
-        
-        try: pygame.mixer.init()
-        except Exception as e: log_message(f"Audio Init Fehler: {e}")
+        self.audio_cache = audio_cache
+        self.models = models
 
-        # Pyttsx3 (System)
+        # Pyttsx3 (System) - erst beim ersten Auflisten der Stimmen initialisiert
         self.local_engine = None
-        try:
-            self.local_engine = pyttsx3.init()
-        except: pass
+        self._local_voices = None
+        self._local_lock = threading.Lock()
 
-        # XTTS (Coqui) - Platzhalter, wird erst bei Bedarf geladen
+        # XTTS (Coqui) - vom ModelManager verwaltet: beim Start im Hintergrund geladen, sobald XTTS
+        # als Stimme gewählt ist, und nach Leerlauf wieder entladen
         self.xtts_model = None 
+        self.xtts_mode = None
+        self.xtts_stats = {}
+        models.register("xtts", load=self._load_xtts_model, unload=self._unload_xtts_model)
+
+    def backend_steps(self):
+        """(Name, Init-Funktion) der Backends, die laut Config beim Start vorbereitet werden."""
+        steps = [("Audio", self.init_audio)]
+        provider = self.config.get("tts_provider", "elevenlabs")
+        if provider == "xtts": steps.append(("XTTS", lambda: self.models.ensure_loaded("xtts")))
+        elif provider == "local": steps.append(("Systemstimme", lambda: bool(self.get_local_voices())))
+        return steps
+
+    def init_audio(self):
+        try:
+            pygame.mixer.init()
+            return True
+        except Exception as e:
+            log_message(f"Audio Init Fehler: {e}", level="ERROR")
+            return False
+
+    def on_config_changed(self, snapshot, changed):
+        self.config = snapshot
+        if "xtts_cpu_optimized" in changed and self.xtts_mode != "cuda":
+            # Betriebsart gewechselt: neu aufbauen (Quantisierung ist nicht umkehrbar). Lädt oder
+            # spricht XTTS gerade, merkt der ModelManager den Wechsel vor und holt ihn danach nach.
+            if not self.models.unload("xtts", "Moduswechsel", reload=True) and self.models.models["xtts"].pending:
+                log_message("XTTS beschäftigt - Moduswechsel wird danach nachgeholt.")
+        if "tts_provider" in changed and snapshot.get("tts_provider") != "xtts":
+            self.models.unload("xtts", "andere Stimme gewählt", keep_wanted=False)
+        if "tts_provider" in changed: self.preload_xtts()
+
+    def preload_xtts(self):
+        """Lädt XTTS in einem Hintergrund-Thread, damit der erste Satz nicht auf das Modell wartet."""
+        if self.config.get("tts_provider") != "xtts": return
+        self.models.preload("xtts")
 
     def _load_xtts_model(self):
-        """Lädt das riesige KI-Modell in den Speicher."""
+        """Lädt das riesige KI-Modell in den Speicher (aufgerufen vom ModelManager)."""
         if self.xtts_model is not None: return True
-        
         log_message("Lade Coqui XTTS v2 Modell (Das dauert einen Moment)...")
         try:
+            import torch
             from TTS.api import TTS
-            # Prüfen ob GPU verfügbar ist
-            use_gpu = torch.cuda.is_available()
-            device_name = "cuda" if use_gpu else "cpu"
-            log_message(f"XTTS läuft auf: {device_name.upper()}")
+            mode = xtts_mode(self.config)
+            device_name = "cuda" if mode == "cuda" else "cpu"
+            log_message(f"XTTS läuft auf: {device_name.upper()} ({mode})")
             
+            start = time.perf_counter()
             # Modell laden (lädt beim ersten Mal automatisch aus dem Internet herunter)
-            self.xtts_model = TTS("tts_models/multilingual/multi-dataset/xtts_v2").to(device_name)
-            log_message("XTTS Modell erfolgreich geladen!")
+            model = TTS(XTTS_MODEL_NAME).to(device_name)
+            if mode == "cpu-int8":
+                threads = optimize_xtts_for_cpu(model, self.config.get("xtts_threads", 0))
+                log_message(f"XTTS CPU-Modus: int8-Linear-Schichten, {threads} Threads")
+            elif device_name == "cpu" and self.config.get("xtts_threads", 0):
+                torch.set_num_threads(int(self.config.get("xtts_threads")))
+            self.xtts_model, self.xtts_mode = model, mode
+            log_message("XTTS Modell erfolgreich geladen!", load_s=f"{time.perf_counter() - start:.1f}")
             return True
         except Exception as e:
-            log_message(f"KRITISCHER FEHLER beim Laden von XTTS: {e}")
+            log_message(f"KRITISCHER FEHLER beim Laden von XTTS: {e}", level="ERROR")
             return False
 
+    def _unload_xtts_model(self):
+        self.xtts_model = None
+        self.xtts_mode = None
+
+    def _record_xtts_run(self, filepath, elapsed, extra_mb):
+        """Real-Time-Factor (Rechenzeit / Audiodauer) und zusätzlicher Speicher pro Synthese, je Betriebsart."""
+        audio_s = wav_duration(filepath)
+        if audio_s <= 0: return
+        rtf = elapsed / audio_s
+        s = self.xtts_stats.setdefault(self.xtts_mode, {"runs": 0, "rtf_total": 0.0, "rtf_last": 0.0, "extra_mb": 0.0})
+        s["runs"] += 1; s["rtf_total"] += rtf; s["rtf_last"] = rtf; s["extra_mb"] = max(s["extra_mb"], extra_mb)
+        log_message("XTTS Synthese", mode=self.xtts_mode, rtf=f"{rtf:.2f}", audio_s=f"{audio_s:.1f}", extra_mb=f"{extra_mb:.0f}")
+
+    def xtts_report(self):
+        if not self.xtts_stats: return "XTTS: noch keine Synthese"
+        return "XTTS: " + ", ".join(f"{mode} RTF {s['rtf_total'] / s['runs']:.2f} (n={s['runs']}), max. +{s['extra_mb']:.0f} MB pro Satz"
+                                    for mode, s in self.xtts_stats.items())
+
     def get_available_xtts_voices(self):
         """Scannt den 'voices' Ordner nach .wav Dateien."""
         voice_dir = os.path.join(os.getcwd(), "voices")
@@ -52,9 +136,19 @@ class TTSService:
         return [f for f in os.listdir(voice_dir) if f.lower().endswith(".wav")]
 
     def get_local_voices(self):
-        if not self.local_engine: return []
-        try: return [(v.id, v.name) for v in self.local_engine.getProperty('voices')]
-        except: return []
+        """Liste (id, name) der Systemstimmen. Der erste Aufruf initialisiert pyttsx3 (langsam, nicht im UI-Thread)."""
+        with self._local_lock:
+            if self._local_voices is None:
+                try:
+                    self.local_engine = pyttsx3.init()
+                    self._local_voices = [(v.id, v.name) for v in self.local_engine.getProperty('voices')]
+                except Exception as e:
+                    log_message(f"Systemstimmen nicht verfügbar: {e}", level="WARNING")
+                    self._local_voices = []
+            return self._local_voices
+
+    def local_voices_loaded(self):
+        return self._local_voices is not None
 
     def fetch_voices(self):
         # ElevenLabs Stimmen laden
@@ -83,7 +177,7 @@ class TTSService:
             return npc_name, gender
         except: return "Unknown", "Unknown"
 
-    def _play_audio_thread(self, filepath):
+    def _play_audio_thread(self, filepath, on_done=None):
         try:
             if not pygame.mixer.get_init(): pygame.mixer.init()
             if pygame.mixer.music.get_busy(): pygame.mixer.music.stop() 
@@ -91,7 +185,8 @@ class TTSService:
             pygame.mixer.music.play()
             while pygame.mixer.music.get_busy(): time.sleep(0.1)
             pygame.mixer.music.unload()
-        except Exception as e: log_message(f"Playback Fehler: {e}")
+            if on_done: on_done()
+        except Exception as e: log_message(f"Playback Fehler: {e}", level="ERROR")
 
     def toggle_pause(self):
         try:
@@ -99,31 +194,46 @@ class TTSService:
             else: pygame.mixer.music.unpause()
         except: pass
 
-    def generate_and_play(self, text, voice_id, cache_file, delay, name, method):
-        if delay > 0: time.sleep(delay)
-        if os.path.exists(cache_file):
+    def generate_and_play(self, text, voice_id, cache_key, delay, name, method, cancel=None):
+        """Spielt aus dem Cache oder synthetisiert. cancel (CancelToken) bricht vor Synthese bzw. Wiedergabe ab."""
+        if delay > 0:
+            if cancel: cancel.sleep(delay)
+            else: time.sleep(delay)
+        cache_file = self.audio_cache.lookup(cache_key)
+        if cancel: cancel.check()
+        if cache_file:
             log_message(f"Spiele aus Cache ({method})...")
-            threading.Thread(target=self._play_audio_thread, args=(cache_file,)).start()
+            self._start_playback(cache_key, cache_file)
             return
 
         provider = self.config.get("tts_provider", "elevenlabs")
         
         if provider == "xtts":
             log_message(f"Generiere mit XTTS KI ({name})...")
-            self._generate_xtts(text, cache_file)
+            cache_file = self.audio_cache.target_path(cache_key, "wav")
+            ok = self._generate_xtts(text, cache_file)
         elif provider == "local":
             log_message(f"Generiere Systemstimme ({name})...")
-            self._generate_local(text, cache_file)
+            cache_file = self.audio_cache.target_path(cache_key, "wav")
+            ok = self._generate_local(text, cache_file)
         else:
             log_message(f"Generiere Cloud ({name})...")
-            self._generate_elevenlabs(text, voice_id, cache_file)
+            cache_file = self.audio_cache.target_path(cache_key, "mp3")
+            ok = self._generate_elevenlabs(text, voice_id, cache_file)
+
+        # Fertige Synthese landet auch bei Abbruch im Cache - nur abgespielt wird sie dann nicht
+        if ok and self.audio_cache.register(cache_key, cache_file):
+            if cancel: cancel.check()
+            self._start_playback(cache_key, cache_file)
+
+    def _start_playback(self, cache_key, filepath):
+        # Nach dem Abspielen darf der Cache die Datei im Hintergrund komprimieren
+        on_done = lambda: self.audio_cache.mark_played(cache_key)
+        threading.Thread(target=self._play_audio_thread, args=(filepath, on_done)).start()
 
     def _generate_xtts(self, text, filepath):
         """Generiert Audio mit Coqui XTTS."""
-        # 1. Modell laden falls noch nicht geschehen
-        if not self._load_xtts_model(): return
-
-        # 2. Referenzdatei finden
+        # 1. Referenzdatei finden
         ref_file = self.config.get("xtts_reference_wav", "")
         ref_path = os.path.join(os.getcwd(), "voices", ref_file)
         
@@ -136,22 +246,41 @@ class TTSService:
                 log_message(f"Nutze Fallback-Stimme: {files[0]}")
             else:
                 log_message("ABBRUCH: Ordner 'voices' ist leer.")
-                return
+                return False
 
-        # 3. Generieren
+        # 2. Generieren (use() lädt das Modell falls nötig und hält es bis zum Ende geladen)
         try:
-            # XTTS generiert direkt eine WAV Datei
+            with self.models.use("xtts"):
+                return self._synthesize_xtts(text, filepath, ref_path)
+        except Exception as e:
+            log_message(f"XTTS Generierung gescheitert: {e}", level="ERROR")
+            return False
+
+    def _synthesize_xtts(self, text, filepath, ref_path):
+        import torch
+        # Speicher pro Synthese: auf CUDA die Spitze über dem Stand vorher (Spitzenzähler pro Satz
+        # zurückgesetzt), auf CPU der RSS-Zuwachs - ru_maxrss wäre die Spitze des ganzen Prozesses.
+        cuda = self.xtts_mode == "cuda"
+        if cuda:
+            torch.cuda.reset_peak_memory_stats()
+            mem_before = torch.cuda.memory_allocated()
+        else: mem_before = process_memory_mb()[0]
+        start = time.perf_counter()
+        # XTTS generiert direkt eine WAV Datei. Inference-Mode nur im CPU-optimierten Modus,
+        # damit die Betriebsarten vergleichbar bleiben.
+        with torch.inference_mode(self.xtts_mode == "cpu-int8"):
             self.xtts_model.tts_to_file(
                 text=text,
                 file_path=filepath,
                 speaker_wav=ref_path,
                 language="de"
             )
-            
-            if os.path.exists(filepath):
-                threading.Thread(target=self._play_audio_thread, args=(filepath,)).start()
-        except Exception as e:
-            log_message(f"XTTS Generierung gescheitert: {e}")
+        elapsed = time.perf_counter() - start
+        if not os.path.exists(filepath): return False
+        if cuda: extra_mb = (torch.cuda.max_memory_allocated() - mem_before) / 1048576
+        else: extra_mb = process_memory_mb()[0] - mem_before
+        self._record_xtts_run(filepath, elapsed, max(0.0, extra_mb))
+        return True
 
     def _generate_local(self, text, filepath):
         try:
@@ -161,9 +290,9 @@ class TTSService:
             temp_engine.setProperty('rate', 145) 
             temp_engine.save_to_file(text, filepath)
             temp_engine.runAndWait()
-            if os.path.exists(filepath):
-                threading.Thread(target=self._play_audio_thread, args=(filepath,)).start()
-        except Exception as e: log_message(f"Lokaler TTS Fehler: {e}")
+            return os.path.exists(filepath)
+        except Exception as e: log_message(f"Lokaler TTS Fehler: {e}", level="ERROR")
+        return False
 
     def _generate_elevenlabs(self, text, voice_id, filepath):
         try:
@@ -173,6 +302,7 @@ class TTSService:
             resp = requests.post(f"https://api.elevenlabs.io/v1/text-to-speech/{voice_id}", headers=headers, json=data)
             if resp.status_code == 200:
                 with open(filepath, "wb") as f: f.write(resp.content)
-                threading.Thread(target=self._play_audio_thread, args=(filepath,)).start()
-            else: log_message(f"API Fehler {resp.status_code}: {resp.text}")
-        except Exception as e: log_message(f"Cloud TTS Fehler: {e}")
+                return True
+            else: log_message(f"API Fehler {resp.status_code}: {resp.text}", level="ERROR")
+        except Exception as e: log_message(f"Cloud TTS Fehler: {e}", level="ERROR")
+        return False
@@ -1,10 +1,21 @@
 import json
 import os
+import copy
+import sys
+import time
+import queue
+import atexit
 import datetime
+import importlib
+import threading
+import statistics
+from contextlib import contextmanager
+from collections.abc import Mapping
 
 CONFIG_FILE = "config.json"
 MAPPING_FILE = "voice_mapping.json"
 LOG_FILE = "app.log"
+STARTUP_PROFILE_FILE = "startup_profile.json"
 
 DEFAULT_CONFIG = {
     "api_key": "",          
@@ -27,41 +38,447 @@ DEFAULT_CONFIG = {
     "ocr_psm": 6,
     "ocr_whitelist": "",
     "debug_mode": False,
+    "debug_save_images": False,   # Debug-Bilder zusätzlich als PNG ablegen (asynchron)
+    "ocr_isolation": False,       # EasyOCR in eigenem Prozess (entlastet UI, Hotkey und Audio)
+    "hybrid_ocr": False,          # EasyOCR + Gemini nur für unsichere Zeilen
+    "hybrid_confidence": 0.6,     # Zeilen unter dieser Konfidenz gehen an Gemini
+    "hybrid_timeout": 8.0,        # Sekunden, danach zählt das lokale Ergebnis
+    "ocr_hedged": False,          # Mit KI-OCR: EasyOCR und Gemini parallel, schnellstes gutes Ergebnis
+    "ai_timeout": 15.0,           # Harte Obergrenze für eine Gemini-Anfrage (Sekunden)
+    "ocr_correction": False,      # OCR-Text korrigieren - braucht ein Lexikon im Ordner "lexicon"
+    "xtts_cpu_optimized": False,  # XTTS auf CPU: int8-Quantisierung + Inference-Mode (schneller, etwas rauer)
+    "xtts_threads": 0,            # Torch-Threads für XTTS auf CPU (0 = automatisch). Gilt prozessweit, also auch für EasyOCR
+    "model_idle_timeout": 600,    # Sekunden ohne Nutzung, danach werden EasyOCR/XTTS entladen (0 = nie)
+    "model_memory_budget_mb": 0,  # Obergrenze für geladene Modelle in MB (0 = unbegrenzt)
+    "api_port": 8765,             # Port der Daemon-API (main.py --daemon, nur localhost)
     "padding_top": 10, "padding_bottom": 20, "padding_left": 10, "padding_right": 50
 }
 
-def load_config():
-    if not os.path.exists(CONFIG_FILE):
-        save_config(DEFAULT_CONFIG)
-        return DEFAULT_CONFIG.copy()
+def _read_config_file(path=CONFIG_FILE):
+    """Liest die Roh-Daten der Config. None bei fehlender oder kaputter Datei."""
     try:
-        with open(CONFIG_FILE, "r", encoding="utf-8") as f:
-            data = json.load(f)
-            updated = False
-            for key, val in DEFAULT_CONFIG.items():
-                if key not in data:
-                    data[key] = val
-                    updated = True
-            if updated: save_config(data)
-            return data
-    except:
-        return DEFAULT_CONFIG.copy()
-
-def save_config(config_data):
+        with open(path, "r", encoding="utf-8") as f: data = json.load(f)
+        return data if isinstance(data, dict) else None
+    except: return None
+
+def load_config(path=CONFIG_FILE):
+    """Lädt die Config einmal, ergänzt fehlende Keys und liefert einen ConfigSnapshot."""
+    if not os.path.exists(path):
+        save_config(DEFAULT_CONFIG, path)
+        return ConfigSnapshot(DEFAULT_CONFIG)
+    data = _read_config_file(path)
+    if data is None: return ConfigSnapshot(DEFAULT_CONFIG)
+    if any(key not in data for key in DEFAULT_CONFIG):
+        save_config(ConfigSnapshot(data), path)
+    return ConfigSnapshot(data)
+
+def save_config(config_data, path=CONFIG_FILE):
     try:
-        with open(CONFIG_FILE, "w", encoding="utf-8") as f:
+        if isinstance(config_data, ConfigSnapshot): config_data = config_data.to_dict()
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
             json.dump(config_data, f, indent=4)
+        os.replace(tmp_path, path)
     except Exception as e:
         print(f"Fehler beim Speichern der Config: {e}")
 
-def log_message(message):
-    timestamp = datetime.datetime.now().strftime("%H:%M:%S")
-    entry = f"[{timestamp}] {message}"
-    print(entry)
+def _coerce_config_value(key, value):
+    """Bringt einen Wert auf den Typ aus DEFAULT_CONFIG, sonst Default."""
+    default = DEFAULT_CONFIG.get(key)
+    if default is None or value is None: return value if value is not None else default
     try:
-        with open(LOG_FILE, "a", encoding="utf-8") as f: f.write(entry + "\n")
-    except: pass
-    return entry
+        if isinstance(default, bool):
+            if isinstance(value, str): return value.strip().lower() in ("1", "true", "yes", "ja", "on")
+            return bool(value)
+        if isinstance(default, int): return int(float(value))
+        if isinstance(default, float): return float(value)
+        if isinstance(default, str): return str(value)
+    except (TypeError, ValueError): return default
+    return value
+
+class ConfigSnapshot(Mapping):
+    """Unveränderlicher, validierter Stand der Config.
+
+    Verhält sich lesend wie das alte Dict (get, [], in), bietet aber die im Hot Path
+    benötigten Werte bereits geparst als Attribute an.
+    """
+    def __init__(self, data):
+        clean = dict(DEFAULT_CONFIG)
+        for key, value in dict(data).items(): clean[key] = _coerce_config_value(key, value)
+        self._data = clean
+        self.paddings = tuple(max(0, clean[k]) for k in ("padding_top", "padding_bottom", "padding_left", "padding_right"))
+        self.monitor_index = max(1, clean["monitor_index"])
+        self.audio_delay = max(0.0, clean["audio_delay"])
+        self.debug_mode = clean["debug_mode"]
+        self.use_ai_ocr = clean["use_ai_ocr"]
+
+    def __getitem__(self, key):
+        value = self._data[key]
+        # Listen/Dicts (z.B. ocr_coords) nur als Kopie herausgeben, sonst ließe sich der Snapshot verändern
+        return copy.deepcopy(value) if isinstance(value, (list, dict)) else value
+    def __iter__(self): return iter(self._data)
+    def __len__(self): return len(self._data)
+    def __repr__(self): return f"ConfigSnapshot({self._data!r})"
+
+    def to_dict(self):
+        return copy.deepcopy(self._data)
+
+    def replace(self, changes):
+        data = self.to_dict(); data.update(changes)
+        return ConfigSnapshot(data)
+
+    def changed_keys(self, other):
+        keys = set(self._data) | set(other)
+        return {k for k in keys if self._data.get(k) != other.get(k)}
+
+class ConfigStore:
+    """Hält den aktuellen ConfigSnapshot, tauscht ihn atomar und benachrichtigt Abonnenten.
+
+    Externe Änderungen an config.json werden per leichtgewichtigem os.stat-Polling erkannt;
+    geparst wird nur, wenn sich Größe oder Änderungszeit der Datei tatsächlich ändern.
+    """
+    def __init__(self, path=CONFIG_FILE):
+        self.path = path
+        self._lock = threading.RLock()
+        self._listeners = []
+        self._watch_stop = None
+        self.snapshot = load_config(path)
+        self._signature = self._file_signature()
+
+    def _file_signature(self):
+        try:
+            st = os.stat(self.path)
+            return (st.st_mtime_ns, st.st_size)
+        except OSError: return None
+
+    def subscribe(self, callback, keys=None):
+        """callback(snapshot, changed_keys) - nur aufgerufen, wenn einer der keys betroffen ist."""
+        keys = frozenset(keys) if keys else None
+        with self._lock: self._listeners.append((callback, keys))
+        return callback
+
+    def unsubscribe(self, callback):
+        with self._lock: self._listeners = [(cb, k) for cb, k in self._listeners if cb is not callback]
+
+    def update(self, changes):
+        """Übernimmt Änderungen, speichert sie und verteilt den neuen Snapshot."""
+        with self._lock:
+            new = self.snapshot.replace(changes)
+            save_config(new, self.path)
+            self._signature = self._file_signature()
+            return self._swap(new)
+
+    def reload(self):
+        """Liest config.json neu ein (z.B. nach externer Bearbeitung)."""
+        with self._lock:
+            self._signature = self._file_signature()
+            data = _read_config_file(self.path)
+            if data is None:
+                log_message("config.json ist ungültig, behalte bisherige Einstellungen.", level="WARNING")
+                return self.snapshot
+            return self._swap(ConfigSnapshot(data))
+
+    def _swap(self, new):
+        changed = self.snapshot.changed_keys(new)
+        if not changed: return self.snapshot
+        self.snapshot = new
+        for callback, keys in list(self._listeners):
+            if keys is not None and not (keys & changed): continue
+            try: callback(new, changed)
+            except Exception as e: log_message(f"Config-Listener Fehler: {e}", level="ERROR")
+        return new
+
+    def start_watching(self, interval=1.0):
+        if self._watch_stop is not None: return
+        self._watch_stop = threading.Event()
+        threading.Thread(target=self._watch_loop, args=(self._watch_stop, interval), name="ConfigWatcher", daemon=True).start()
+
+    def stop_watching(self):
+        if self._watch_stop is not None: self._watch_stop.set()
+        self._watch_stop = None
+
+    def _watch_loop(self, stop, interval):
+        while not stop.wait(interval):
+            sig = self._file_signature()
+            if sig is None or sig == self._signature: continue
+            log_message("config.json wurde extern geändert, lade neu...")
+            self.reload()
+
+# --- LOGGING ---
+# Aufrufer legen nur einen Eintrag in die Queue, ein einzelner Hintergrund-Thread
+# schreibt gebündelt in die Datei. So blockiert weder Scan- noch TTS-Thread auf Datei-I/O.
+LOG_MAX_BYTES = 2 * 1024 * 1024
+LOG_BACKUP_COUNT = 3
+LOG_LEVELS = {"DEBUG": 10, "INFO": 20, "WARNING": 30, "ERROR": 40}
+
+class AsyncLogWriter:
+    """Queue-basierter Log-Schreiber mit Batch-Flush und Rotation nach Dateigröße."""
+    def __init__(self, path=LOG_FILE, max_bytes=LOG_MAX_BYTES, backup_count=LOG_BACKUP_COUNT,
+                 min_level="INFO", echo=True, batch_size=500):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.min_level = LOG_LEVELS.get(min_level, 20)
+        self.echo = echo
+        self.batch_size = batch_size
+        self.dropped = 0
+        self._queue = queue.SimpleQueue()
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._size = None
+        self._ts_second = None
+        self._ts_text = ""
+
+    def _ensure_started(self):
+        if self._thread is not None: return
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="LogWriter", daemon=True)
+                self._thread.start()
+
+    def _timestamp(self):
+        # strftime nur einmal pro Sekunde
+        now = int(time.time())
+        if now != self._ts_second:
+            self._ts_text = datetime.datetime.fromtimestamp(now).strftime("%H:%M:%S")
+            self._ts_second = now
+        return self._ts_text
+
+    def format(self, message, level="INFO", fields=None):
+        entry = f"[{self._timestamp()}] "
+        if level != "INFO": entry += f"[{level}] "
+        entry += str(message)
+        if fields: entry += " | " + " ".join(f"{k}={v}" for k, v in fields.items())
+        return entry
+
+    def log(self, message, level="INFO", **fields):
+        # Erst filtern: gefilterte DEBUG-Zeilen kosten so nur einen Dict-Lookup
+        if LOG_LEVELS.get(level, 20) < self.min_level: return None
+        entry = self.format(message, level, fields)
+        self._ensure_started()
+        self._queue.put(entry)
+        return entry
+
+    def flush(self, timeout=2.0):
+        """Wartet, bis alle bisher eingereihten Einträge geschrieben sind."""
+        if self._thread is None: return True
+        done = threading.Event()
+        self._queue.put(done)
+        return done.wait(timeout)
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < self.batch_size:
+                try: batch.append(self._queue.get_nowait())
+                except queue.Empty: break
+            lines = [item for item in batch if isinstance(item, str)]
+            if lines: self._write(lines)
+            for item in batch:
+                if isinstance(item, threading.Event): item.set()
+
+    def _write(self, lines):
+        text = "\n".join(lines) + "\n"
+        if self.echo and sys.stdout is not None:
+            try: sys.stdout.write(text); sys.stdout.flush()
+            except: pass
+        try:
+            if self._size is None:
+                self._size = os.path.getsize(self.path) if os.path.exists(self.path) else 0
+            data = text.encode("utf-8")
+            if self.max_bytes and self._size + len(data) > self.max_bytes and self._size > 0:
+                try: self._rotate()
+                except OSError:
+                    # z.B. app.log gerade gelöscht oder gesperrt: Größe neu bestimmen und trotzdem schreiben
+                    self._size = os.path.getsize(self.path) if os.path.exists(self.path) else 0
+            with open(self.path, "ab") as f: f.write(data)
+            self._size += len(data)
+        except:
+            self.dropped += len(lines)
+            self._size = None  # beim nächsten Batch neu von der Platte lesen
+
+    def _rotate(self):
+        for i in range(self.backup_count - 1, 0, -1):
+            src = f"{self.path}.{i}"
+            if os.path.exists(src): os.replace(src, f"{self.path}.{i + 1}")
+        if self.backup_count > 0: os.replace(self.path, f"{self.path}.1")
+        else: os.remove(self.path)
+        self._size = 0
+
+_log_writer = AsyncLogWriter()
+atexit.register(_log_writer.flush)
+
+def log_message(message, level="INFO", **fields):
+    """Reiht eine Log-Zeile ein und gibt den formatierten Eintrag zurück (None, wenn unter min_level)."""
+    return _log_writer.log(message, level, **fields)
+
+def set_log_level(level):
+    _log_writer.min_level = LOG_LEVELS.get(level, 20)
+
+def flush_log(timeout=2.0):
+    return _log_writer.flush(timeout)
+
+# --- ABBRUCH ---
+class ScanCancelled(Exception):
+    """Der Scan wurde von einem neueren Auslöser abgelöst."""
+
+class CancelToken:
+    """Abbruch-Signal für einen laufenden Scan; OCR und TTS prüfen es zwischen ihren Schritten."""
+    def __init__(self):
+        self._event = threading.Event()
+        self.captured = False  # Eingabe steht fest (Screenshot) - ein neuer Auslöser macht den Lauf jetzt veraltet
+
+    def cancel(self):
+        self._event.set()
+
+    def mark_captured(self):
+        self.captured = True
+
+    @property
+    def cancelled(self):
+        return self._event.is_set()
+
+    def check(self):
+        if self._event.is_set(): raise ScanCancelled()
+
+    def sleep(self, seconds):
+        """Wie time.sleep, bricht aber sofort mit ScanCancelled ab."""
+        if self._event.wait(seconds): raise ScanCancelled()
+
+# --- STARTPROFIL ---
+# Misst Import- und Init-Zeiten beim Programmstart. Jeder Lauf landet in startup_profile.json
+# (die letzten STARTUP_PROFILE_HISTORY), deutliche Ausreißer gegenüber dem Median werden geloggt.
+STARTUP_PROFILE_HISTORY = 20
+
+class StartupProfile:
+    """Sammelt (Art, Name, Dauer) für Importe, Initialisierungen und Meilensteine des Starts."""
+    def __init__(self, path=STARTUP_PROFILE_FILE):
+        self.path = path
+        self.t0 = time.perf_counter()
+        self.entries = []
+        self.finished = False
+        self._lock = threading.Lock()
+
+    def begin(self, t0):
+        """Verlegt den Nullpunkt nach vorn (so früh wie möglich in main.py gemessen)."""
+        self.t0 = min(self.t0, t0)
+
+    def record(self, kind, name, seconds):
+        entry = {"kind": kind, "name": name, "ms": round(seconds * 1000, 1),
+                 "at_ms": round((time.perf_counter() - self.t0) * 1000, 1), "thread": threading.current_thread().name}
+        with self._lock: self.entries.append(entry)
+
+    @contextmanager
+    def measure(self, kind, name):
+        start = time.perf_counter()
+        try: yield
+        finally: self.record(kind, name, time.perf_counter() - start)
+
+    def mark(self, name):
+        """Meilenstein, gemessen ab Programmstart (z.B. Fenster sichtbar)."""
+        self.record("mark", name, time.perf_counter() - self.t0)
+
+    def report(self):
+        with self._lock: entries = list(self.entries)
+        lines = ["Startprofil:"]
+        for e in entries:
+            lines.append(f"  {e['kind']:<6} {e['name']:<32} {e['ms']:8.1f} ms  (bei {e['at_ms']:.0f} ms, {e['thread']})")
+        return "\n".join(lines)
+
+    def finish(self):
+        """Schreibt den Lauf in den Verlauf und meldet Einträge, die deutlich langsamer als üblich sind."""
+        with self._lock:
+            if self.finished: return
+            self.finished = True
+            entries = list(self.entries)
+        try:
+            with open(self.path, "r", encoding="utf-8") as f: history = json.load(f)
+            if not isinstance(history, list): history = []
+        except: history = []
+        baseline = {}
+        for run in history:
+            for e in run.get("entries", []): baseline.setdefault((e["kind"], e["name"]), []).append(e["ms"])
+        log_message(self.report())
+        for e in entries:
+            past = baseline.get((e["kind"], e["name"]))
+            if not past: continue
+            median = statistics.median(past)
+            if e["ms"] > max(median * 1.5, median + 100):
+                log_message(f"Start langsamer als üblich: {e['kind']} {e['name']}", level="WARNING",
+                            ms=f"{e['ms']:.0f}", median_ms=f"{median:.0f}")
+        history.append({"date": datetime.datetime.now().isoformat(timespec="seconds"), "entries": entries})
+        try:
+            tmp = self.path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f: json.dump(history[-STARTUP_PROFILE_HISTORY:], f, indent=1)
+            os.replace(tmp, self.path)
+        except Exception as e: log_message(f"Startprofil nicht gespeichert: {e}", level="WARNING")
+        window = next((e["ms"] for e in entries if e["kind"] == "mark" and e["name"] == "Fenster sichtbar"), None)
+        if window is not None: log_message(f"Fenster nach {window:.0f} ms sichtbar, Backends nach {(time.perf_counter() - self.t0) * 1000:.0f} ms bereit.")
+
+startup_profile = StartupProfile()
+
+def import_profiled(name):
+    """importlib.import_module mit Zeitmessung im Startprofil (nur beim ersten Import)."""
+    module = sys.modules.get(name)
+    if module is not None: return module
+    start = time.perf_counter()
+    module = importlib.import_module(name)
+    startup_profile.record("import", name, time.perf_counter() - start)
+    return module
+
+class LazyModule:
+    """Platzhalter für ein schweres Modul: importiert erst beim ersten Attributzugriff.
+
+    `cv2 = LazyModule("cv2")` verhält sich danach wie das echte Modul, der Import kostet aber
+    erst dort Zeit, wo das Backend tatsächlich benutzt wird.
+    """
+    def __init__(self, name):
+        self.__dict__["_name"] = name
+        self.__dict__["_module"] = None
+
+    def _load(self):
+        module = self.__dict__["_module"]
+        if module is None:
+            module = import_profiled(self.__dict__["_name"])
+            self.__dict__["_module"] = module
+        return module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __setattr__(self, attr, value):
+        setattr(self._load(), attr, value)
+
+    def __repr__(self):
+        state = "geladen" if self.__dict__["_module"] is not None else "noch nicht geladen"
+        return f"<LazyModule {self.__dict__['_name']} ({state})>"
+
+# --- SPEICHER ---
+def process_memory_mb():
+    """(aktueller, maximaler) Arbeitsspeicher dieses Prozesses in MB. (0, 0) wenn nicht ermittelbar."""
+    try:
+        if sys.platform == "win32":
+            import ctypes
+            from ctypes import wintypes
+            class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+                _fields_ = [("cb", wintypes.DWORD), ("PageFaultCount", wintypes.DWORD),
+                            ("PeakWorkingSetSize", ctypes.c_size_t), ("WorkingSetSize", ctypes.c_size_t),
+                            ("QuotaPeakPagedPoolUsage", ctypes.c_size_t), ("QuotaPagedPoolUsage", ctypes.c_size_t),
+                            ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t), ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+                            ("PagefileUsage", ctypes.c_size_t), ("PeakPagefileUsage", ctypes.c_size_t)]
+            counters = PROCESS_MEMORY_COUNTERS(); counters.cb = ctypes.sizeof(counters)
+            handle = ctypes.windll.kernel32.GetCurrentProcess()
+            if not ctypes.windll.psapi.GetProcessMemoryInfo(handle, ctypes.byref(counters), counters.cb): return 0.0, 0.0
+            return counters.WorkingSetSize / 1048576, counters.PeakWorkingSetSize / 1048576
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        peak = peak / 1048576 if sys.platform == "darwin" else peak / 1024  # macOS: Bytes, Linux: KB
+        current = peak
+        try:
+            with open("/proc/self/statm") as f: current = int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1048576
+        except: pass
+        return current, max(peak, current)
+    except: return 0.0, 0.0
 
 # Mapping Funktionen bleiben unverändert...
 def load_mapping():